@@ -0,0 +1,114 @@
+################################################################
+#
+# functions to compute the fractional standard deviation (FSD)
+# of a light curve as a function of the averaging interval
+#
+# For each interval size the light curve is cut into consecutive
+# chunks of that duration, the FSD = std/mean of every chunk is
+# computed and averaged over all chunks.
+#
+# All chunk edges for all interval sizes are found with a single
+# np.searchsorted call and the chunk means and variances come
+# from cumulative sums, so dense grids of interval sizes cost
+# about as much as a single one.
+#
+################################################################
+import numpy as np                    # imports library for math
+
+
+################################################################
+#
+# function fracStdDev(ctime,flux,intervals)
+#
+# Computes the mean FSD of the light curve (ctime, flux) for every
+# interval size in [intervals] (same units as ctime).
+#
+# For an interval size T, the edges are placed at the samples
+# closest to min(ctime) + T, 2T, ... and every chunk runs up to
+# and including its edge sample. The partial chunk after the
+# last edge is dropped, as are empty chunks inside data gaps.
+#
+# Returns a numpy array with the mean FSD for every interval
+# (nan if the light curve is shorter than the interval)
+#
+################################################################
+
+def fracStdDev(ctime,flux,intervals):
+    ctime=np.asarray(ctime,dtype=float)
+    flux=np.asarray(flux,dtype=float)
+    intervals=np.atleast_1d(np.asarray(intervals,dtype=float))
+
+    order=np.argsort(ctime,kind='stable')   # edges need time-ordered data
+    ctime=ctime[order]
+    flux=flux[order]
+    Npoints=np.size(ctime)
+
+    # number of edges for every interval size
+    nedges=((ctime[-1]-ctime[0])/intervals).astype(int)
+
+    # edge times of all interval sizes, concatenated
+    interval_id=np.repeat(np.arange(np.size(intervals)),nedges)
+    edge_number=np.arange(np.sum(nedges))-np.repeat(np.cumsum(nedges)-nedges,nedges)+1
+    targets=ctime[0]+intervals[interval_id]*edge_number
+
+    # index of the sample closest to each edge (the earlier one on ties)
+    right=np.clip(np.searchsorted(ctime,targets),1,Npoints-1)
+    left=right-1
+    closest=np.where(targets-ctime[left]<=ctime[right]-targets,left,right)
+    closest[targets>=ctime[-1]]=Npoints-1
+
+    # chunk boundaries: every chunk ends just after its edge sample and
+    # the next one starts there; the partial chunk after the last edge
+    # is not used
+    chunk_id=interval_id
+    ends=closest+1
+    is_first=edge_number==1
+    starts=np.where(is_first,0,np.roll(ends,1))
+
+    # chunk sums from cumulative sums of the mean-subtracted flux
+    fmean=np.mean(flux)
+    csum=np.concatenate(([0.],np.cumsum(flux-fmean)))
+    csum2=np.concatenate(([0.],np.cumsum((flux-fmean)**2)))
+
+    npts=ends-starts
+    valid=npts>0
+    n=np.where(valid,npts,1)
+    mean=(csum[ends]-csum[starts])/n
+    var=np.maximum((csum2[ends]-csum2[starts])/n-mean**2,0.)
+    chunk_fsd=np.sqrt(var)/(mean+fmean)
+
+    # average the FSD of the non-empty chunks of every interval size
+    total=np.bincount(chunk_id[valid],weights=chunk_fsd[valid],minlength=np.size(intervals))
+    count=np.bincount(chunk_id[valid],minlength=np.size(intervals))
+    fsds=np.full(np.size(intervals),np.nan)
+    ok=(count>0)&(nedges>0)
+    fsds[ok]=total[ok]/count[ok]
+
+    return fsds
+
+
+################################################################
+#
+# function fracStdDevAll(datasets,intervals)
+#
+# Computes the FSD vs interval for many light curves in one call.
+# [datasets] is a dictionary of (ctime, flux, ...) tuples, e.g. the
+# output of readAllArrays, or a models x samples flux array together
+# with a common time axis as a (ctime, flux2d) tuple (nan padding at
+# the end of a row is ignored).
+#
+# Returns a dictionary with the same keys (or model indices) holding
+# the FSD for every interval
+#
+################################################################
+
+def fracStdDevAll(datasets,intervals):
+    if isinstance(datasets,dict):
+        return {key:fracStdDev(data[0],data[1],intervals) for key,data in datasets.items()}
+
+    ctime,flux2d=datasets
+    fsds={}
+    for imodel,flux in enumerate(np.atleast_2d(flux2d)):
+        good=np.isfinite(flux)
+        fsds[imodel]=fracStdDev(ctime[good],flux[good],intervals)
+    return fsds
@@ -6,6 +6,7 @@
 # DP July 4, 2019
 #
 ################################################################
+import os                             # import library for file paths
 import numpy as np                    # imports library for math
 import matplotlib.pyplot as plt       # import library for plots
 import pandas as pd                   # import pandas for reading data
@@ -69,3 +70,40 @@ def readALMA(fname):
 
     return ctime,flux,flux_err
 
+################################################################
+#
+# function readAllArrays(datadir=None)
+#
+# Reads every SMA/ALMA light curve found under [datadir], which
+# holds the SMA/ and ALMA/ subdirectories. By default this is the
+# EHT_Data directory this file lives in, so it works both from
+# the Plots directory and from the top-level scripts.
+#
+# File names follow SM_STAND_<band>_<day>.dat (SMA) and
+# AA_STAND_<band>_<day>.dat (ALMA), e.g. SM_STAND_HI_Apr05.dat
+#
+# Returns a dictionary keyed by (array, band, day), e.g.
+# ('SMA','HI','Apr05'), holding (ctime, flux, flux_err) tuples
+# exactly as returned by readSMA/readALMA
+#
+################################################################
+
+def readAllArrays(datadir=None):
+    if datadir is None:
+        datadir=os.path.join(os.path.dirname(os.path.abspath(__file__)),'..')
+
+    readers={'SMA':('SM_STAND_',readSMA),'ALMA':('AA_STAND_',readALMA)}
+
+    alldata={}
+    for array,(prefix,reader) in readers.items():
+        arraydir=os.path.join(datadir,array)
+        if not os.path.isdir(arraydir):
+            continue
+        for fname in sorted(os.listdir(arraydir)):
+            if not (fname.startswith(prefix) and fname.endswith('.dat')):
+                continue
+            band,day=fname[len(prefix):-4].split('_')   # e.g. HI_Apr05
+            alldata[(array,band,day)]=reader(os.path.join(arraydir,fname))
+
+    return alldata
+
@@ -0,0 +1,152 @@
+################################################################
+#
+# functions to decimate long light curves for display
+#
+# A 300 hr light curve has thousands of samples but the axes are
+# only ~1000 pixels wide, so most points sent to matplotlib land
+# on the same pixel column. These functions keep only the points
+# that change what is drawn:
+#
+# minmaxDecimate: the first, minimum, maximum and last sample in
+#                 every pixel column (peaks are always kept)
+# lttbDecimate  : Largest-Triangle-Three-Buckets (Steinarsson 2013),
+#                 a fixed number of visually representative points
+#
+# DecimationCache keeps the decimated curves per resolution so
+# redrawing or saving at the same size costs nothing.
+#
+################################################################
+import numpy as np                    # imports library for math
+
+
+################################################################
+#
+# function minmaxDecimate(x,y,npix)
+#
+# Splits the x range of the (x-sorted) curve into [npix] equal
+# columns and keeps, in every column, the first and last sample
+# and the samples with the minimum and maximum y.
+#
+# Returns the decimated x and y arrays (at most 4*npix points)
+#
+################################################################
+
+def minmaxDecimate(x,y,npix):
+    x=np.asarray(x)
+    y=np.asarray(y)
+    if np.size(x)<=4*npix:
+        return x,y
+
+    # pixel column of every sample
+    span=x[-1]-x[0]
+    column=np.minimum(((x-x[0])/span*npix).astype(int),npix-1)
+
+    # columns are contiguous in the x-sorted input
+    starts=np.flatnonzero(np.diff(column,prepend=-1))
+    ends=np.append(starts[1:]-1,np.size(x)-1)
+    counts=ends-starts+1
+
+    # first sample in every column equal to the column minimum/maximum
+    colmin=np.repeat(np.minimum.reduceat(y,starts),counts)
+    colmax=np.repeat(np.maximum.reduceat(y,starts),counts)
+    imin=np.flatnonzero(y==colmin)
+    imax=np.flatnonzero(y==colmax)
+    imin=imin[np.unique(column[imin],return_index=True)[1]]
+    imax=imax[np.unique(column[imax],return_index=True)[1]]
+
+    keep=np.unique(np.concatenate((imin,imax,starts,ends)))
+    return x[keep],y[keep]
+
+
+################################################################
+#
+# function lttbDecimate(x,y,nout)
+#
+# Largest-Triangle-Three-Buckets decimation to [nout] points. The
+# first and last points are kept; in every bucket in between the
+# point forming the largest triangle with the previously selected
+# point and the mean of the next bucket is kept.
+#
+# Returns the decimated x and y arrays
+#
+################################################################
+
+def lttbDecimate(x,y,nout):
+    x=np.asarray(x,dtype=float)
+    y=np.asarray(y,dtype=float)
+    N=np.size(x)
+    if nout>=N or nout<3:
+        return x,y
+
+    # bucket edges for the N-2 interior points
+    edges=(np.arange(nout-1)*(N-2)/(nout-2)).astype(int)+1
+    edges[-1]=N-1
+
+    keep=np.empty(nout,dtype=int)
+    keep[0]=0
+    keep[-1]=N-1
+
+    a=0
+    for ibucket in range(nout-2):
+        lo,hi=edges[ibucket],edges[ibucket+1]
+
+        # mean of the next bucket (the last point for the final bucket)
+        if ibucket<nout-3:
+            nlo,nhi=edges[ibucket+1],edges[ibucket+2]
+            xm=x[nlo:nhi].mean()
+            ym=y[nlo:nhi].mean()
+        else:
+            xm,ym=x[-1],y[-1]
+
+        area=np.abs((x[a]-xm)*(y[lo:hi]-y[a])-(x[a]-x[lo:hi])*(ym-y[a]))
+        a=lo+np.argmax(area)
+        keep[ibucket+1]=a
+
+    return x[keep],y[keep]
+
+
+################################################################
+#
+# function axesPixelWidth(ax)
+#
+# Width of the axes [ax] in display pixels, i.e. the number of
+# columns a curve spanning the whole x axis can occupy
+#
+################################################################
+
+def axesPixelWidth(ax):
+    return max(int(np.ceil(ax.get_window_extent().width)),1)
+
+
+################################################################
+#
+# class DecimationCache
+#
+# Keeps the decimated version of every curve per (key, resolution,
+# method), so that repeated draws at the same size reuse them.
+#
+# Example:
+#   cache=DecimationCache()
+#   xd,yd=cache.get(filename,ctime,flux,npix=axesPixelWidth(ax))
+#
+################################################################
+
+class DecimationCache:
+
+    def __init__(self):
+        self.curves={}
+
+    def get(self,key,x,y,npix,method='minmax'):
+        cachekey=(key,int(npix),method)
+        if cachekey not in self.curves:
+            if method=='minmax':
+                self.curves[cachekey]=minmaxDecimate(x,y,int(npix))
+            elif method=='lttb':
+                # ~2 points per pixel column to keep peaks at this resolution
+                self.curves[cachekey]=lttbDecimate(x,y,2*int(npix))
+            else:
+                raise ValueError(f"Unknown decimation method: {method}")
+        return self.curves[cachekey]
+
+    def clear(self):
+        self.curves.clear()
@@ -0,0 +1,118 @@
+################################################################
+#
+# functions to remove the slow trends from the simulation light
+# curves with a zero-phase high-pass filter
+#
+# The whole models x samples grid (see readsim.py) is filtered in
+# one call along axis 1, either with a forward-backward Butterworth
+# filter (scipy.signal.sosfiltfilt) or with the equivalent gain
+# applied in the Fourier domain. Being zero-phase, neither needs
+# the first hours to be stitched in to hide a start-up transient.
+#
+# The detrended curves are written next to the raw ones as
+# <model>_det.out files in the _var.out format, so they can be
+# read with readSimGrid(suffix='_det.out') by any analysis.
+#
+################################################################
+import numpy as np                    # imports library for math
+from scipy import signal              # import filter design and filtering
+try:
+    from readsim import readSimGrid,simFilename
+except ImportError:                   # imported from the GRMHD Variability directory
+    from Simulations.readsim import readSimGrid,simFilename
+
+
+################################################################
+#
+# function detrendGrid(flux,dt,nsamp=None,tcut=4.,order=3,method='filtfilt')
+#
+# High-pass filters every light curve (row) of [flux] with a
+# Butterworth filter of order [order] and cutoff frequency 1/[tcut],
+# where [dt] and [tcut] are in hours. The mean flux of every curve is
+# added back so the detrended curves stay in Jy.
+#
+# method='filtfilt' applies the filter forward and backward with
+# signal.sosfiltfilt; method='fft' multiplies the Fourier transform by
+# the same squared Butterworth gain, which treats each curve as
+# periodic.
+#
+# Rows of the same length [nsamp] are filtered together; nan padding
+# beyond nsamp is kept.
+#
+# Returns the models x samples array of detrended fluxes
+#
+################################################################
+
+def detrendGrid(flux,dt,nsamp=None,tcut=4.,order=3,method='filtfilt'):
+    flux=np.atleast_2d(np.asarray(flux,dtype=float))
+    if nsamp is None:
+        nsamp=np.full(flux.shape[0],flux.shape[1])
+    nsamp=np.asarray(nsamp)
+
+    fcut=1./tcut
+    detrended=np.full(flux.shape,np.nan)
+
+    for n in np.unique(nsamp):
+        rows=np.flatnonzero(nsamp==n)
+        block=flux[rows,:n]
+        meanflux=block.mean(axis=1,keepdims=True)
+
+        if method=='filtfilt':
+            sos=signal.butter(order,fcut,'highpass',fs=1./dt,output='sos')
+            filtered=signal.sosfiltfilt(sos,block-meanflux,axis=1)
+        elif method=='fft':
+            freq=np.fft.rfftfreq(n,dt)
+            with np.errstate(divide='ignore'):
+                gain=1./(1.+(fcut/freq)**(2*order))   # |H|^2 of the high-pass filter
+            filtered=np.fft.irfft(np.fft.rfft(block-meanflux,axis=1)*gain,n,axis=1)
+        else:
+            raise ValueError(f"Unknown detrending method: {method}")
+
+        detrended[rows,:n]=filtered+meanflux
+
+    return detrended
+
+
+################################################################
+#
+# function detrendLibrary(simdir=None,tcut=4.,order=3,method='filtfilt')
+#
+# Reads the whole simulation grid, detrends it with detrendGrid and
+# writes one <model>_det.out file next to every <model>_var.out file,
+# keeping the frame numbers of the raw file. The filter settings are
+# recorded in the header line.
+#
+# Returns the outputs of readSimGrid with the detrended fluxes:
+# params, ctime, flux_detrended, nsamp
+#
+################################################################
+
+def detrendLibrary(simdir=None,tcut=4.,order=3,method='filtfilt'):
+    params,ctime,flux,nsamp=readSimGrid(simdir)
+    dt=ctime[1]-ctime[0]
+    detrended=detrendGrid(flux,dt,nsamp,tcut,order,method)
+
+    header=f"frame I  (detrended: {method}, order {order}, cutoff {tcut} hr)"
+    for imodel,p in enumerate(params):
+        rawfile=simFilename(p["field"],p["incl"],p["bhspin"],p["Rratio"],simdir)
+        detfile=simFilename(p["field"],p["incl"],p["bhspin"],p["Rratio"],simdir,suffix='_det.out')
+
+        frame0=np.loadtxt(rawfile,max_rows=1)[0]
+        n=nsamp[imodel]
+        frames=frame0+np.arange(n)
+        np.savetxt(detfile,np.column_stack((frames,detrended[imodel,:n])),
+                   fmt=['%d','%.16g'],header=header)
+
+    return params,ctime,detrended,nsamp
+
+
+if __name__ == "__main__":
+    import argparse
+    ap=argparse.ArgumentParser(description="Write detrended _det.out files for the simulation grid")
+    ap.add_argument("--tcut",type=float,default=4.,help="cutoff timescale in hours")
+    ap.add_argument("--order",type=int,default=3)
+    ap.add_argument("--method",type=str,default="filtfilt",choices=["filtfilt","fft"])
+    args=ap.parse_args()
+
+    params,ctime,detrended,nsamp=detrendLibrary(tcut=args.tcut,order=args.order,method=args.method)
+    print(f"Detrended {len(params)} light curves (cutoff {args.tcut} hr)")
@@ -3,7 +3,8 @@ import matplotlib.pyplot as plt        # import library for plots
 from scipy import stats                # import binning statistics
 from matplotlib import rcParams        # import to change plot parameters
 import pandas as pd                    # import pandas for reading data
-from scipy import signal
+from readsim import readSimGrid,fieldall,TUNIT_HOURS
+from detrend import detrendGrid
 
 ###################################
 #   EHT scatter+line plot style 
@@ -93,83 +94,65 @@ def structFunc(time,value,error,nbins):
     return bin_centers[condition],np.sqrt(D1[condition]),sigmaSQRTD[condition]
 
 
-# create the root for the filenames
+# read the whole simulation grid as one models x samples array
+params,ctimeall,fluxall,nsamp=readSimGrid()
 
-inclinationsall=['10.0','30.0','50.0','70.0']
-fieldall=['S','M']
-bhallspin=[-0.94,-0.5,0.0,0.5,0.94]
-Rratioall=[10,40,160]
+# detrend all light curves at once with a zero-phase Butterworth
+# high-pass filter of order 3 with a cutoff timescale of *tcut* hours
+tcut=4.0
+detrendedall=detrendGrid(fluxall,TUNIT_HOURS,nsamp,tcut=tcut,order=3)
+
+# use the detrended light curves for the structure function
+use_detrended=True
 
 for field in fieldall:
     structall=np.array([])
 
     
-    for incl in inclinationsall:
-        for bhspin in bhallspin:
-            for Rratio in Rratioall:
-
-                # make a filename based on the input parameters
-                if (field=='S'):
-                    filename="SANE/"+field+"a"+str(bhspin)+".i"+incl+".R"+str(Rratio)+"_var.out"
-                elif (field=='M'):
-                    filename="MAD/"+field+"a"+str(bhspin)+".i"+incl+".R"+str(Rratio)+"_var.out"
-                # read all the data
-                alldata=np.genfromtxt(filename)
-                
-                # first column is time in 5M, which is 0.00588 hrs for Sgr A* (@4.3 10^6 Msun)
-                ctime=(alldata[:,0]-alldata[0,0])*0.02942
-                # next column is flux
-                flux=alldata[:,1]
-                # makeup an error for later
-                err=np.ones(np.size(flux))*0.001
-                
-                # thining
-                thin=5
-                ctime=ctime[::thin]
-                flux=flux[::thin]
-                err=err[::thin]
-                
-                # create a Butterworth filter of order 3 with a timescale of 2hours
-                # (or cutoff frequency of 1/2/2)
-                sos = signal.butter(3, 1./4., 'highpass', fs=1./0.02942, output='sos')
-                
-                # add the DC level of the flux to the filtered lightcurve
-                meanfluxlevel=2.0
-                filtered = signal.sosfilt(sos, flux)+meanfluxlevel
-                
-                # for the first *tinin* hours use the original data, to avoid boundary effects
-                tinit=2.0
-                # find the normalization of the initial data to avoid jumps at the stitching point
-                filterrenorm=flux[ctime>tinit]/filtered[ctime>tinit]
-                allfiltered=np.append(flux[ctime<=tinit]/filterrenorm[0],filtered[ctime>tinit])
-                
-                # plot the detrended data
-                #plt.plot(ctime,allfiltered,label=filename[:-8])
-                
-                # make a set of equdistant bins between 0 and 8 hours
-                nbins=np.linspace(0,8.,NumberofBins+1)
-                
-                # total duration
-                duration=ctime[-1]
-                
-                # stop the individual values
-                struct1hr=np.array([])
-                
-                # split this in 10h chunks, separated by half hour
-                for starttime in np.arange(0.,duration-10.,0.25):
-                    #print(starttime)
-                    conditionC=(ctime>=starttime) & (ctime<starttime+10)
-                    
-                    tlag,sqrtD1,errorD1=structFunc(ctime[conditionC],flux[conditionC],err[conditionC],nbins)
-                    
-                    #save the structure function at 1hr
-                    conditionp=((tlag>0.94) & (tlag<1.1))
-                    structC=sqrtD1[conditionp]
-                    struct1hr=np.append(struct1hr,structC)
-
-                print(field,incl,bhspin,Rratio,np.size(struct1hr[struct1hr<0.10])/np.size(struct1hr))
-
-                structall=np.append(structall,struct1hr)
+    for imodel,p in enumerate(params):
+        if (p["field"]!=field):
+            continue
+        incl,bhspin,Rratio=p["incl"],p["bhspin"],p["Rratio"]
+
+        n=nsamp[imodel]
+        ctime=ctimeall[:n]
+        flux=detrendedall[imodel,:n] if use_detrended else fluxall[imodel,:n]
+        # makeup an error for later
+        err=np.ones(np.size(flux))*0.001
+        
+        # thining
+        thin=5
+        ctime=ctime[::thin]
+        flux=flux[::thin]
+        err=err[::thin]
+        
+        # plot the detrended data
+        #plt.plot(ctime,flux,label=field+str(bhspin)+str(incl)+str(Rratio))
+        
+        # make a set of equdistant bins between 0 and 8 hours
+        nbins=np.linspace(0,8.,NumberofBins+1)
+        
+        # total duration
+        duration=ctime[-1]
+        
+        # stop the individual values
+        struct1hr=np.array([])
+        
+        # split this in 10h chunks, separated by half hour
+        for starttime in np.arange(0.,duration-10.,0.25):
+            #print(starttime)
+            conditionC=(ctime>=starttime) & (ctime<starttime+10)
+            
+            tlag,sqrtD1,errorD1=structFunc(ctime[conditionC],flux[conditionC],err[conditionC],nbins)
+            
+            #save the structure function at 1hr
+            conditionp=((tlag>0.94) & (tlag<1.1))
+            structC=sqrtD1[conditionp]
+            struct1hr=np.append(struct1hr,structC)
+
+        print(field,incl,bhspin,Rratio,np.size(struct1hr[struct1hr<0.10])/np.size(struct1hr))
+
+        structall=np.append(structall,struct1hr)
 
             
     plt.hist(structall,25,lw=2,histtype='step',density=True,label='Illinois '+field)     
@@ -2,6 +2,8 @@ import numpy as np                     # imports library for math
 import matplotlib.pyplot as plt        # import library for plots
 from scipy import stats                # import binning statistics
 from matplotlib import rcParams        # import to change plot parameters
+from decimate import DecimationCache,axesPixelWidth
+from readsim import TUNIT_HOURS
 
 ###################################
 #   EHT scatter+line plot style 
@@ -42,6 +44,11 @@ rcParams['lines.markersize']=6
 
 plt.figure(figsize=figsize)            # size of the figure
 
+# decimate the curves to the pixel width of the axes before plotting;
+# the peaks are kept and the decimated curves are cached per resolution
+decimated=DecimationCache()
+npix=axesPixelWidth(plt.gca())
+
 # list of black-hall inclinations
 #possible values ['10.0','30.0','50.0','70.0']
 inclinationsall=['10.0']
@@ -73,15 +80,18 @@ for field in fieldall:
                 # read all the data
                 alldata=np.genfromtxt(filename)
                 
-                # first column is time in 5GM/c^3, which is 0.05883 hrs for Sgr A* (@4.3 10^6 Msun)
-                ctime=(alldata[:,0]-alldata[0,0])*0.05883
+                # first column is the frame number, one frame is 5 GM/c^3, which is
+                # TUNIT_HOURS=0.02942 hrs for Sgr A* (@4.3 10^6 Msun); use
+                # FRAME_TG*tgHours(mass) for another black-hole mass
+                ctime=(alldata[:,0]-alldata[0,0])*TUNIT_HOURS
                 # next column is flux
                 flux=alldata[:,1]
 
                 # print overall standard deviation and mean flux
                 print(filename," std:",np.std(flux)," mean:",np.mean(flux))
                 
-                plt.plot(ctime,flux,lw=1,label=filename[:-8])
+                xplot,yplot=decimated.get(filename,ctime,flux,npix)
+                plt.plot(xplot,yplot,lw=1,label=filename[:-8])
                 
 plt.xlabel(r"Time (hr)")
 plt.ylabel(r"Flux (Jy)")
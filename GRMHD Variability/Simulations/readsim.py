@@ -0,0 +1,127 @@
+################################################################
+#
+# functions to read the GRMHD simulation light curves (_var.out)
+# one at a time or as the whole parameter grid in one array
+#
+################################################################
+import os                             # import library for file paths
+import numpy as np                    # imports library for math
+
+# parameter grid of the simulation library
+inclinationsall=['10.0','30.0','50.0','70.0']
+fieldall=['S','M']
+bhallspin=[-0.94,-0.5,0.0,0.5,0.94]
+Rratioall=[10,40,160]
+
+# physical constants (cgs) and the mass of Sgr A* in solar masses
+GNEWTON=6.674e-8
+CLIGHT=2.998e10
+MSUN=1.989e33
+SGRA_MASS=4.3e6
+
+# one row of a _var.out file is 5 GM/c^3
+FRAME_TG=5.
+
+
+################################################################
+#
+# function tgHours(mass=SGRA_MASS)
+#
+# Gravitational time GM/c^3 in hours for a black hole of [mass]
+# solar masses (0.005884 hrs for Sgr A* @4.3 10^6 Msun). The
+# distance does not enter the time scale.
+#
+################################################################
+
+def tgHours(mass=SGRA_MASS):
+    return GNEWTON*mass*MSUN/CLIGHT**3/3600.
+
+
+# one row of a _var.out file in hours for Sgr A* (0.02942 hrs)
+TUNIT_HOURS=FRAME_TG*tgHours(SGRA_MASS)
+
+# directory holding the SANE/ and MAD/ subdirectories
+SIMDIR=os.path.dirname(os.path.abspath(__file__))
+
+
+################################################################
+#
+# function simFilename(field,incl,bhspin,Rratio,simdir=None,suffix='_var.out',subdirsuffix='')
+#
+# Builds the file name of one model, e.g.
+# <simdir>/MAD/Ma0.5.i30.0.R40_var.out, or with suffix='_sf.npz'
+# and subdirsuffix='npz' the structure function file
+# <simdir>/MADnpz/Ma0.5.i30.0.R40_sf.npz
+#
+################################################################
+
+def simFilename(field,incl,bhspin,Rratio,simdir=None,suffix='_var.out',subdirsuffix=''):
+    if simdir is None:
+        simdir=SIMDIR
+    subdir=('SANE' if field=='S' else 'MAD')+subdirsuffix
+    return os.path.join(simdir,subdir,field+"a"+str(bhspin)+".i"+str(incl)+".R"+str(Rratio)+suffix)
+
+
+################################################################
+#
+# function readSim(fname,tunit=TUNIT_HOURS)
+#
+# Reads one _var.out light curve with columns
+# frame, flux
+#
+# Returns two numpy arrays:
+# ctime: time since the first frame in hours (frames * tunit);
+#        use tunit=FRAME_TG for units of GM/c^3
+# flux : total flux in Jy
+#
+################################################################
+
+def readSim(fname,tunit=TUNIT_HOURS):
+    alldata=np.genfromtxt(fname)
+
+    ctime=(alldata[:,0]-alldata[0,0])*tunit   # time is column 1
+    flux=alldata[:,1]                         # flux is column 2
+
+    return ctime,flux
+
+
+################################################################
+#
+# function readSimGrid(simdir=None,fields=fieldall,inclinations=inclinationsall,
+#                      bhspins=bhallspin,Rratios=Rratioall,tunit=TUNIT_HOURS,
+#                      suffix='_var.out')
+#
+# Reads every model of the parameter grid into one models x samples
+# array. All light curves share the same cadence but not the same
+# length, so shorter ones are padded with nan at the end.
+#
+# Returns:
+# params: list of dictionaries with field, incl, bhspin, Rratio
+#         (one per row of flux)
+# ctime : common time axis in hours (length of the longest model)
+# flux  : models x samples array of fluxes, nan padded
+# nsamp : number of valid samples of every model
+#
+################################################################
+
+def readSimGrid(simdir=None,fields=fieldall,inclinations=inclinationsall,
+                bhspins=bhallspin,Rratios=Rratioall,tunit=TUNIT_HOURS,suffix='_var.out'):
+    params=[]
+    curves=[]
+    for field in fields:
+        for incl in inclinations:
+            for bhspin in bhspins:
+                for Rratio in Rratios:
+                    fname=simFilename(field,incl,bhspin,Rratio,simdir,suffix)
+                    ctime,flux=readSim(fname,tunit)
+                    params.append({"field":field,"incl":float(incl),"bhspin":bhspin,"Rratio":Rratio})
+                    curves.append(flux)
+
+    nsamp=np.array([len(c) for c in curves])
+    flux=np.full((len(curves),nsamp.max()),np.nan)
+    for imodel,c in enumerate(curves):
+        flux[imodel,:len(c)]=c
+
+    ctime=np.arange(nsamp.max())*tunit
+
+    return params,ctime,flux,nsamp
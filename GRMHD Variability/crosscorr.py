@@ -0,0 +1,368 @@
+################################################################
+#
+# Discrete cross-correlation of irregularly sampled light curves
+#
+# Implements the discrete correlation function (DCF) of Edelson &
+# Krolik (1988) and a z-transformed variant (Alexander 1997) for
+# the SMA/ALMA light curves, with lag uncertainties from flux
+# randomization / random subset selection (Peterson et al. 1998).
+#
+# All pairs of the two light curves are formed once with array
+# broadcasting and binned with np.bincount; the Monte Carlo
+# realizations reuse the same pair list and are evaluated in
+# batches, so no Python loop ever runs over pairs or lag bins.
+#
+# Usage (from the GRMHD Variability directory):
+#   from crosscorr import dcf_all_combinations
+#   results = dcf_all_combinations()
+#
+################################################################
+import numpy as np                     # imports library for math
+import matplotlib.pyplot as plt        # import library for plots
+from EHT_Data.Plots.readarray import readAllArrays
+
+# largest number of (realization, pair) products held in memory at once
+MAX_BATCH_PRODUCTS = 2**24
+
+
+def _pair_bins(time1, time2, lag_edges):
+    """
+    Form every (i, j) pair of the two light curves and assign the lag
+    time2[j] - time1[i] to a bin of `lag_edges`.
+
+    Returns the indices i, j of the pairs that fall inside the lag range
+    and the bin index of each of them.
+    """
+    lag = time2[None, :] - time1[:, None]
+    ibin = np.searchsorted(lag_edges, lag, side='right') - 1
+    inside = (ibin >= 0) & (ibin < len(lag_edges) - 1)
+    pi, pj = np.nonzero(inside)
+    return pi, pj, ibin[pi, pj]
+
+
+def _binned_sums(weights, pbin, nbins, nsets=1):
+    """
+    Sum `weights` (nsets x npairs) into `nbins` lag bins for every set
+    with a single bincount call.
+    """
+    offsets = (np.arange(nsets) * nbins)[:, None]
+    sums = np.bincount((pbin[None, :] + offsets).ravel(),
+                       weights=np.reshape(weights, (nsets, -1)).ravel(),
+                       minlength=nsets * nbins)
+    return sums.reshape(nsets, nbins)
+
+
+def _dcf_batch(flux1, err1, w1, flux2, err2, w2, pi, pj, pbin, nbins, method):
+    """
+    DCF / ZDCF of a batch of realizations of the two light curves.
+
+    flux*, w* have shape (nsets, npoints); w* are 0/1 weights that mark
+    which points were selected in each realization. Returns the
+    correlation and its uncertainty, both with shape (nsets, nbins).
+    """
+    nsets = flux1.shape[0]
+    pw = w1[:, pi] * w2[:, pj]
+    npairs = _binned_sums(pw, pbin, nbins, nsets)
+
+    a = flux1[:, pi]
+    b = flux2[:, pj]
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        if method == 'dcf':
+            # means, variances and mean errors over the selected points
+            n1 = w1.sum(axis=1, keepdims=True)
+            n2 = w2.sum(axis=1, keepdims=True)
+            mean1 = (flux1 * w1).sum(axis=1, keepdims=True) / n1
+            mean2 = (flux2 * w2).sum(axis=1, keepdims=True) / n2
+            var1 = (w1 * (flux1 - mean1)**2).sum(axis=1, keepdims=True) / n1
+            var2 = (w2 * (flux2 - mean2)**2).sum(axis=1, keepdims=True) / n2
+            e1 = (err1 * w1).sum(axis=1, keepdims=True) / n1
+            e2 = (err2 * w2).sum(axis=1, keepdims=True) / n2
+
+            # subtract the measurement noise when it does not exceed the variance
+            norm1 = np.where(var1 > e1**2, var1 - e1**2, var1)
+            norm2 = np.where(var2 > e2**2, var2 - e2**2, var2)
+
+            udcf = (a - mean1) * (b - mean2) / np.sqrt(norm1 * norm2)
+            sum1 = _binned_sums(pw * udcf, pbin, nbins, nsets)
+            sum2 = _binned_sums(pw * udcf**2, pbin, nbins, nsets)
+
+            corr = sum1 / npairs
+            corr_err = np.sqrt(np.maximum(sum2 - npairs * corr**2, 0.)) / (npairs - 1)
+            corr[npairs < 2] = np.nan
+            corr_err[npairs < 2] = np.nan
+
+        elif method == 'zdcf':
+            # Pearson coefficient of the pairs in each bin, then Fisher z
+            sa = _binned_sums(pw * a, pbin, nbins, nsets)
+            sb = _binned_sums(pw * b, pbin, nbins, nsets)
+            saa = _binned_sums(pw * a * a, pbin, nbins, nsets)
+            sbb = _binned_sums(pw * b * b, pbin, nbins, nsets)
+            sab = _binned_sums(pw * a * b, pbin, nbins, nsets)
+
+            corr = (npairs * sab - sa * sb) / np.sqrt((npairs * saa - sa**2) * (npairs * sbb - sb**2))
+            corr = np.clip(corr, -1., 1.)
+            z = np.arctanh(np.clip(corr, -1. + 1e-12, 1. - 1e-12))
+            sigz = 1. / np.sqrt(npairs - 3.)
+            corr_err = 0.5 * (np.tanh(z + sigz) - np.tanh(z - sigz))
+            corr[npairs < 4] = np.nan
+            corr_err[npairs < 4] = np.nan
+
+        else:
+            raise ValueError(f"Unknown correlation method: {method}")
+
+    return corr, corr_err
+
+
+def discrete_crosscorr(time1, flux1, err1, time2, flux2, err2, lag_edges=None,
+                       dlag=None, lag_max=None, method='dcf'):
+    """
+    Compute the discrete cross-correlation function of two irregularly
+    sampled light curves.
+
+    Parameters
+    ----------
+    time1, flux1, err1 : array-like
+        Times, fluxes and flux errors of the first light curve.
+    time2, flux2, err2 : array-like
+        Times, fluxes and flux errors of the second light curve.
+    lag_edges : array-like, optional
+        Edges of the lag bins (same units as time). Positive lags mean the
+        second light curve lags behind the first.
+    dlag : float, optional
+        Width of the lag bins if `lag_edges` is not given. Defaults to
+        four times the median sampling interval of the sparser light curve.
+    lag_max : float, optional
+        Largest absolute lag if `lag_edges` is not given. Defaults to half
+        the overlap of the two light curves.
+    method : {'dcf', 'zdcf'}
+        Edelson & Krolik DCF, or the Fisher z-transformed Pearson coefficient
+        of the pairs in each lag bin.
+
+    Returns
+    -------
+    lag : array
+        Centers of the lag bins.
+    corr : array
+        Correlation coefficient in each lag bin (nan where too few pairs).
+    corr_err : array
+        Uncertainty of the correlation coefficient in each lag bin.
+    npairs : array
+        Number of pairs in each lag bin.
+    """
+    time1, flux1, err1 = (np.asarray(x, dtype=float) for x in (time1, flux1, err1))
+    time2, flux2, err2 = (np.asarray(x, dtype=float) for x in (time2, flux2, err2))
+
+    if lag_edges is None:
+        lag_edges = default_lag_edges(time1, time2, dlag, lag_max)
+    lag_edges = np.asarray(lag_edges, dtype=float)
+    nbins = len(lag_edges) - 1
+
+    pi, pj, pbin = _pair_bins(time1, time2, lag_edges)
+    corr, corr_err = _dcf_batch(flux1[None, :], err1[None, :], np.ones((1, len(time1))),
+                                flux2[None, :], err2[None, :], np.ones((1, len(time2))),
+                                pi, pj, pbin, nbins, method)
+    npairs = np.bincount(pbin, minlength=nbins)
+
+    lag = 0.5 * (lag_edges[1:] + lag_edges[:-1])
+    return lag, corr[0], corr_err[0], npairs
+
+
+def default_lag_edges(time1, time2, dlag=None, lag_max=None):
+    """
+    Symmetric lag bins centered on zero lag, used when none are given.
+    """
+    if dlag is None:
+        dlag = 4. * max(np.median(np.diff(np.sort(time1))), np.median(np.diff(np.sort(time2))))
+    if lag_max is None:
+        overlap = min(np.max(time1), np.max(time2)) - max(np.min(time1), np.min(time2))
+        lag_max = 0.5 * max(overlap, 2. * dlag)
+    nhalf = int(np.ceil(lag_max / dlag - 0.5))
+    return (np.arange(-nhalf, nhalf + 2) - 0.5) * dlag
+
+
+def crosscorr_lag_uncertainty(time1, flux1, err1, time2, flux2, err2, lag_edges=None,
+                              dlag=None, lag_max=None, method='dcf', nsim=1000,
+                              centroid_frac=0.8, seed=None):
+    """
+    Estimate the uncertainty of the cross-correlation peak and centroid lags
+    by flux randomization and random subset selection (FR/RSS).
+
+    Every realization perturbs the fluxes by their Gaussian errors and keeps
+    the points picked by a draw with replacement (duplicates are ignored).
+    The realizations share one pair list and are evaluated in batches.
+
+    Parameters
+    ----------
+    time1, flux1, err1, time2, flux2, err2, lag_edges, dlag, lag_max, method :
+        As in `discrete_crosscorr`.
+    nsim : int, optional
+        Number of FR/RSS realizations.
+    centroid_frac : float, optional
+        The centroid lag uses the bins with correlation above this fraction
+        of the peak.
+    seed : int or None, optional
+        Seed of the random number generator.
+
+    Returns
+    -------
+    result : dict
+        'peak' and 'centroid': (median, lower, upper) lags, where lower and
+        upper bracket the central 68% of the realizations;
+        'peak_dist' and 'centroid_dist': the lags of every realization.
+    """
+    rng = np.random.default_rng(seed)
+
+    time1, flux1, err1 = (np.asarray(x, dtype=float) for x in (time1, flux1, err1))
+    time2, flux2, err2 = (np.asarray(x, dtype=float) for x in (time2, flux2, err2))
+
+    if lag_edges is None:
+        lag_edges = default_lag_edges(time1, time2, dlag, lag_max)
+    lag_edges = np.asarray(lag_edges, dtype=float)
+    nbins = len(lag_edges) - 1
+    lag = 0.5 * (lag_edges[1:] + lag_edges[:-1])
+
+    pi, pj, pbin = _pair_bins(time1, time2, lag_edges)
+    batch = int(max(1, min(nsim, MAX_BATCH_PRODUCTS // max(len(pi), 1))))
+
+    peak = np.empty(nsim)
+    centroid = np.empty(nsim)
+
+    for start in range(0, nsim, batch):
+        nset = min(batch, nsim - start)
+
+        # random subset selection: points drawn at least once are kept
+        w1 = _rss_weights(rng, nset, len(time1))
+        w2 = _rss_weights(rng, nset, len(time2))
+
+        # flux randomization
+        f1 = flux1 + err1 * rng.standard_normal((nset, len(time1)))
+        f2 = flux2 + err2 * rng.standard_normal((nset, len(time2)))
+
+        corr, _ = _dcf_batch(f1, np.broadcast_to(err1, f1.shape), w1,
+                             f2, np.broadcast_to(err2, f2.shape), w2,
+                             pi, pj, pbin, nbins, method)
+
+        filled = np.where(np.isnan(corr), -np.inf, corr)
+        ipeak = np.argmax(filled, axis=1)
+        cpeak = filled[np.arange(nset), ipeak]
+        peak[start:start + nset] = lag[ipeak]
+
+        above = filled >= centroid_frac * cpeak[:, None]
+        cw = np.where(above, filled, 0.)
+        centroid[start:start + nset] = (cw * lag).sum(axis=1) / cw.sum(axis=1)
+
+    def summary(values):
+        lo, med, hi = np.nanpercentile(values, [15.87, 50., 84.13])
+        return med, lo, hi
+
+    return {'peak': summary(peak),
+            'centroid': summary(centroid),
+            'peak_dist': peak,
+            'centroid_dist': centroid}
+
+
+def _rss_weights(rng, nset, npoints):
+    """
+    0/1 weights of a random subset selection: npoints draws with
+    replacement, every point drawn at least once is kept once.
+    """
+    draws = rng.integers(0, npoints, size=(nset, npoints))
+    offsets = (np.arange(nset) * npoints)[:, None]
+    counts = np.bincount((draws + offsets).ravel(), minlength=nset * npoints)
+    return (counts.reshape(nset, npoints) > 0).astype(float)
+
+
+def dcf_all_combinations(alldata=None, days=None, bands=('HI', 'LO'), arrays=('SMA', 'ALMA'),
+                         lag_edges=None, dlag=None, lag_max=None, method='dcf',
+                         nsim=1000, seed=None):
+    """
+    Cross-correlate every simultaneous pair of EHT light curves:
+    SMA vs ALMA for each day and band, and HI vs LO for each day and array.
+
+    Parameters
+    ----------
+    alldata : dict, optional
+        Light curves keyed by (array, band, day), as returned by
+        `readAllArrays`. Read from the EHT_Data directory if None.
+    days : list of str, optional
+        Days to use (e.g. ['Apr06', 'Apr07']). All days by default.
+    bands, arrays : tuple of str
+        Bands and arrays to use.
+    lag_edges, dlag, lag_max, method :
+        As in `discrete_crosscorr`.
+    nsim : int, optional
+        Number of FR/RSS realizations for the lag uncertainties
+        (0 to skip them).
+    seed : int or None, optional
+        Seed of the random number generator.
+
+    Returns
+    -------
+    results : dict
+        Keyed by the pair of light-curve keys, e.g.
+        (('SMA','HI','Apr06'), ('ALMA','HI','Apr06')). Each entry holds
+        'lag', 'corr', 'corr_err', 'npairs' and, if nsim > 0, the
+        'peak' and 'centroid' lag summaries.
+    """
+    if alldata is None:
+        alldata = readAllArrays()
+    if days is None:
+        days = sorted({key[2] for key in alldata})
+
+    pairs = []
+    for day in days:
+        for band in bands:
+            for i, array1 in enumerate(arrays):
+                for array2 in arrays[i + 1:]:
+                    pairs.append(((array1, band, day), (array2, band, day)))
+        for array in arrays:
+            for i, band1 in enumerate(bands):
+                for band2 in bands[i + 1:]:
+                    pairs.append(((array, band1, day), (array, band2, day)))
+
+    rng = np.random.default_rng(seed)
+
+    results = {}
+    for key1, key2 in pairs:
+        if key1 not in alldata or key2 not in alldata:
+            continue
+        time1, flux1, err1 = alldata[key1]
+        time2, flux2, err2 = alldata[key2]
+
+        edges = lag_edges
+        if edges is None:
+            edges = default_lag_edges(time1, time2, dlag, lag_max)
+
+        lag, corr, corr_err, npairs = discrete_crosscorr(time1, flux1, err1, time2, flux2, err2,
+                                                         edges, method=method)
+        entry = {'lag': lag, 'corr': corr, 'corr_err': corr_err, 'npairs': npairs}
+
+        if nsim > 0:
+            unc = crosscorr_lag_uncertainty(time1, flux1, err1, time2, flux2, err2,
+                                            edges, method=method, nsim=nsim,
+                                            seed=rng.integers(2**32))
+            entry['peak'] = unc['peak']
+            entry['centroid'] = unc['centroid']
+
+        results[(key1, key2)] = entry
+
+    return results
+
+
+if __name__ == "__main__":
+
+    results = dcf_all_combinations(dlag=0.1, lag_max=2.0, nsim=500, seed=1)
+
+    fig, ax = plt.subplots(figsize=(7.5, 5.5))
+    for (key1, key2), res in results.items():
+        label = f"{key1[2]} {key1[0]} {key1[1]} vs {key2[0]} {key2[1]}"
+        ax.errorbar(res['lag'], res['corr'], res['corr_err'], fmt='.-', ms=3, lw=0.8, label=label)
+        med, lo, hi = res['centroid']
+        print(f"{label:32s} centroid lag = {med:+.3f} (+{hi-med:.3f}/-{med-lo:.3f}) h")
+
+    ax.set_xlabel('Lag (h)')
+    ax.set_ylabel('DCF')
+    ax.legend(frameon=False, fontsize='xx-small')
+    plt.tight_layout()
+    plt.show()
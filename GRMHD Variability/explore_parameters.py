@@ -0,0 +1,280 @@
+import time                            # import library for timing the updates
+import numpy as np                     # imports library for math
+import matplotlib.pyplot as plt        # import library for plots
+from matplotlib.collections import LineCollection
+from matplotlib.patches import Rectangle
+from matplotlib.widgets import Slider, CheckButtons, Button
+from sfgrid import load_sim_sf, load_eht_sf, interp_sf, PARAM_KEYS
+
+
+###############################
+#   Explorer settings
+###############################
+
+# lags in hours selectable with the deltaTau slider
+lags = np.geomspace(0.15, 5.0, 120)
+deltaTau = 0.5 # hours, initial value
+
+# number of randomly chosen non-outlier groups connected by lines
+max_normal_lines = 10
+
+# outlier points of interest (POIs); click on a point to add/remove it
+POIs = [
+    {'incl':10.0, 'bhspin':-0.5, 'Rratio':160, 'field':'S'},
+    {'incl':30.0, 'bhspin':-0.5, 'Rratio':160, 'field':'S'},
+    {'incl':10.0, 'bhspin':-0.5, 'Rratio':40, 'field':'S'}
+]
+
+titles = {'field': 'Magnetic Field Type (S/M)', 'incl': 'Inclination (degrees)',
+          'bhspin': 'Black Hole Spin', 'Rratio': 'Rratio'}
+
+RED = np.array([1., 0., 0., 0.8])
+BLACK = np.array([0., 0., 0., 0.8])
+BLUE = np.array([0.12, 0.47, 0.71, 1.])
+
+#################################
+#  Precomputed arrays
+#################################
+
+params, sim_curves = load_sim_sf()
+eht_labels, eht_curves = load_eht_sf()
+
+# D1 of every model and EHT day at every selectable lag (models x lags)
+simD1 = interp_sf(sim_curves, lags)
+ehtD1 = interp_sf(eht_curves, lags)
+with np.errstate(all='ignore'):
+    eht_lo = np.nanmin(ehtD1, axis=0)
+    eht_hi = np.nanmax(ehtD1, axis=0)
+
+nmodels = len(params['field'])
+
+# numeric x position of every model for every parameter; the magnetic
+# field type is categorical (S/M in the order of the grid)
+xpos = {}
+xticks = {}
+for key in PARAM_KEYS:
+    values = params[key]
+    if values.dtype.kind in 'US':
+        _, first = np.unique(values, return_index=True)
+        categories = values[np.sort(first)]
+        xpos[key] = np.argmax(values[:, None] == categories[None, :], axis=1).astype(float)
+        xticks[key] = (np.arange(len(categories)), categories)
+    else:
+        xpos[key] = values.astype(float)
+        uvalues = np.unique(values)
+        xticks[key] = (uvalues, [str(v) for v in uvalues])
+
+
+def build_groups(x_key):
+    """
+    Group the models that share every parameter except `x_key` and return,
+    for connecting lines, the model indices at both ends of every segment.
+    """
+    others = [k for k in PARAM_KEYS if k != x_key]
+    codes = np.stack([np.unique(params[k], return_inverse=True)[1].ravel() for k in others], axis=1)
+    _, group = np.unique(codes, axis=0, return_inverse=True)
+    group = group.ravel()
+
+    # models sorted by group, then by x; neighbours in the same group are joined
+    order = np.lexsort((xpos[x_key], group))
+    same = group[order[:-1]] == group[order[1:]]
+    return group, order[:-1][same], order[1:][same]
+
+
+rng = np.random.default_rng(0)
+panels = []
+for key in PARAM_KEYS:
+    group, seg_a, seg_b = build_groups(key)
+    ngroups = group.max() + 1
+    panels.append({'key': key, 'group': group, 'ngroups': ngroups,
+                   'seg_a': seg_a, 'seg_b': seg_b, 'seg_group': group[seg_a],
+                   'rank': rng.permutation(ngroups)})
+
+# POI flag of every model
+poi = np.zeros(nmodels, dtype=bool)
+for p in POIs:
+    poi |= np.all([params[k] == p[k] for k in p], axis=0)
+
+state = {'ilag': int(np.argmin(np.abs(lags - deltaTau))), 'show_all': False, 'redraw_ms': 0.}
+
+
+###############################
+#   Blitting helper
+###############################
+
+class BlitManager:
+    """
+    Keeps a copy of the static figure and redraws only the animated
+    artists on top of it.
+    """
+
+    def __init__(self, canvas, artists):
+        self.canvas = canvas
+        self.background = None
+        self.artists = []
+        for a in artists:
+            a.set_animated(True)
+            self.artists.append(a)
+        self.cid = canvas.mpl_connect("draw_event", self.on_draw)
+
+    def on_draw(self, event):
+        self.background = self.canvas.copy_from_bbox(self.canvas.figure.bbox)
+        self.draw_animated()
+
+    def draw_animated(self):
+        fig = self.canvas.figure
+        for a in self.artists:
+            fig.draw_artist(a)
+
+    def update(self):
+        if self.background is None:
+            self.canvas.draw()
+            return
+        self.canvas.restore_region(self.background)
+        self.draw_animated()
+        self.canvas.blit(self.canvas.figure.bbox)
+        self.canvas.flush_events()
+
+
+###############################
+#   Figure
+###############################
+
+fig, axes = plt.subplots(2, 2, figsize=(9, 7.2))
+fig.subplots_adjust(bottom=0.18, hspace=0.4, wspace=0.3)
+
+animated = []
+for panel, ax in zip(panels, axes.ravel()):
+    key = panel['key']
+
+    lc = LineCollection([], linewidths=1.5, zorder=1)
+    ax.add_collection(lc)
+    sc = ax.scatter(xpos[key], np.ones(nmodels), zorder=2, picker=True, pickradius=5)
+    band = Rectangle((0, 1), 1, 1, transform=ax.get_yaxis_transform(), color='red', alpha=0.3, zorder=0)
+    ax.add_patch(band)
+    annot = ax.annotate("", xy=(0, 0), xytext=(10, 10), textcoords="offset points", fontsize=7,
+                        bbox=dict(boxstyle="round", fc="w", alpha=0.9), zorder=5)
+    annot.set_visible(False)
+
+    panel.update({'ax': ax, 'lc': lc, 'sc': sc, 'band': band, 'annot': annot})
+    animated += [band, lc, sc, annot]
+
+    ticks, labels = xticks[key]
+    pad = 0.1 * (ticks[-1] - ticks[0]) if len(ticks) > 1 else 0.5
+    ax.set_xlim(ticks[0] - pad, ticks[-1] + pad)
+    ax.set_xticks(ticks)
+    ax.set_xticklabels(labels)
+    ax.set_ylim([0.0008, 1])
+    ax.set_yscale('log')
+    ax.set_ylabel(r'Log $[D^1(\tau)]$')
+    ax.set_xlabel(titles[key])
+    ax.set_title('Structure Function vs ' + titles[key], fontsize=9)
+
+status = fig.text(0.5, 0.97, "", ha='center', va='top', fontsize=10)
+animated.append(status)
+
+# widgets: deltaTau slider, line toggle, POI reset
+ax_slider = fig.add_axes([0.15, 0.06, 0.5, 0.03])
+slider = Slider(ax_slider, r'$\Delta\tau$', 0, len(lags) - 1, valinit=state['ilag'], valstep=1)
+slider.drawon = False
+slider.valtext.set_text(f"{lags[state['ilag']]:.2f} hr")
+animated += [slider.poly, slider.valtext] + ([slider._handle] if hasattr(slider, '_handle') else [])
+
+ax_check = fig.add_axes([0.72, 0.03, 0.14, 0.08])
+check = CheckButtons(ax_check, ['all lines'], [state['show_all']])
+ax_button = fig.add_axes([0.88, 0.04, 0.09, 0.05])
+button = Button(ax_button, 'clear POIs')
+
+blit = BlitManager(fig.canvas, animated)
+
+
+###############################
+#   Updates
+###############################
+
+def refresh():
+    t0 = time.perf_counter()
+    ilag = state['ilag']
+    y = simD1[:, ilag]
+    colors = np.where(poi[:, None], RED, BLUE)
+
+    for panel in panels:
+        x = xpos[panel['key']]
+        a, b = panel['seg_a'], panel['seg_b']
+
+        group_poi = np.bincount(panel['group'], weights=poi, minlength=panel['ngroups']) > 0
+        seg_poi = group_poi[panel['seg_group']]
+        visible = seg_poi | state['show_all'] | (panel['rank'][panel['seg_group']] < max_normal_lines)
+
+        segments = np.stack((np.column_stack((x[a], y[a])), np.column_stack((x[b], y[b]))), axis=1)
+        panel['lc'].set_segments(segments[visible])
+        panel['lc'].set_colors(np.where(seg_poi[visible, None], RED, BLACK))
+
+        panel['sc'].set_offsets(np.column_stack((x, y)))
+        panel['sc'].set_facecolors(colors)
+
+        panel['band'].set_y(eht_lo[ilag])
+        panel['band'].set_height(eht_hi[ilag] - eht_lo[ilag])
+
+    ninside = np.count_nonzero((y >= eht_lo[ilag]) & (y <= eht_hi[ilag]))
+    slider.valtext.set_text(f"{lags[ilag]:.2f} hr")
+    status.set_text(fr"$\tau$ = {lags[ilag]:.2f} hr: {ninside}/{nmodels} models in EHT band, "
+                    f"{np.count_nonzero(poi)} POIs  (last redraw {state['redraw_ms']:.0f} ms)")
+    blit.update()
+    state['redraw_ms'] = 1e3 * (time.perf_counter() - t0)
+
+
+def on_slider(val):
+    state['ilag'] = int(val)
+    refresh()
+
+
+def on_check(label):
+    state['show_all'] = not state['show_all']
+    refresh()
+
+
+def on_clear(event):
+    poi[:] = False
+    refresh()
+
+
+def on_pick(event):
+    for panel in panels:
+        if event.artist is panel['sc'] and len(event.ind) > 0:
+            i = event.ind[0]
+            poi[i] = not poi[i]
+            print(("added POI: " if poi[i] else "removed POI: ") +
+                  ", ".join(f"{k}={params[k][i]}" for k in PARAM_KEYS))
+            refresh()
+            return
+
+
+def on_move(event):
+    changed = False
+    for panel in panels:
+        annot = panel['annot']
+        hit = False
+        if event.inaxes is panel['ax']:
+            hit, info = panel['sc'].contains(event)
+        if hit:
+            i = info['ind'][0]
+            annot.xy = panel['sc'].get_offsets()[i]
+            annot.set_text(f"Field: {params['field'][i]}\nIncl: {params['incl'][i]}\n"
+                           f"Spin: {params['bhspin'][i]}\nRratio: {params['Rratio'][i]}\n"
+                           f"D1: {simD1[i, state['ilag']]:.4f}")
+        if hit != annot.get_visible() or hit:
+            annot.set_visible(hit)
+            changed = True
+    if changed:
+        blit.update()
+
+
+slider.on_changed(on_slider)
+check.on_clicked(on_check)
+button.on_clicked(on_clear)
+fig.canvas.mpl_connect('pick_event', on_pick)
+fig.canvas.mpl_connect('motion_notify_event', on_move)
+
+refresh()
+plt.show()
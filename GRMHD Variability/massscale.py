@@ -0,0 +1,104 @@
+################################################################
+#
+# Black-hole-mass rescaling of simulation structure functions
+#
+# The simulations are scale free: their time unit is GM/c^3, and
+# only the comparison with the EHT data needs the mass of Sgr A*
+# to turn it into hours. The structure functions are therefore
+# accumulated in units of GM/c^3 (see plotsf.py) with their
+# per-bin sums and pair counts, and converted to hours here for
+# any mass. Changing the mass only multiplies the lag-bin edges,
+# so a mass scan needs no new pair computation.
+#
+# The _sf.npz files must be written by the current plotsf.py;
+# files holding only tlag and D1 are refused with a request to
+# regenerate them (run plotsf.py).
+#
+# Usage:
+#   acc_tg = load_sf_tg("Simulations/MADnpz/Ma0.5.i30.0.R40_sf.npz")
+#   tlag, D1 = sf_in_hours(acc_tg, 4.0e6)
+#
+################################################################
+import numpy as np                     # imports library for math
+from sfaccum import SFAccumulator
+from Simulations.readsim import tgHours, SGRA_MASS
+
+
+def load_sf_tg(fname):
+    """
+    Read the structure function accumulator, in units of GM/c^3, stored in
+    an _sf.npz file written by plotsf.py.
+    """
+    return SFAccumulator.load(fname)
+
+
+def sf_in_hours(acc_tg, mass=SGRA_MASS, bin_edges=None, errors=False):
+    """
+    Convert a structure function accumulated in units of GM/c^3 to hours.
+
+    Parameters
+    ----------
+    acc_tg : SFAccumulator
+        Accumulator with lags in GM/c^3.
+    mass : float, optional
+        Black-hole mass in solar masses.
+    bin_edges : array-like, optional
+        Common lag bins in hours to combine the rescaled bins onto, e.g. to
+        compare different masses on the same axis. By default the rescaled
+        bins are returned as they are.
+    errors : bool, optional
+        Also return the standard error of D1.
+
+    Returns
+    -------
+    tlag, D1 (, sigmaD1) : arrays
+        As returned by SFAccumulator.result(), with tlag in hours.
+    """
+    acc = acc_tg.scaled(tgHours(mass))
+    if bin_edges is not None:
+        acc = acc.rebinned(bin_edges)
+    return acc.result(errors=errors)
+
+
+def mass_scan(acc_tg, masses, bin_edges):
+    """
+    Structure function in hours for many black-hole masses at once.
+
+    Every bin in GM/c^3 is moved to hours for every mass and its sums and
+    pair counts are added into the common bins `bin_edges` (hours) with a
+    single bincount.
+
+    Parameters
+    ----------
+    acc_tg : SFAccumulator
+        Accumulator with lags in GM/c^3.
+    masses : array-like
+        Black-hole masses in solar masses.
+    bin_edges : array-like
+        Common lag bins in hours.
+
+    Returns
+    -------
+    tlag : array
+        Centers of the common lag bins (hours).
+    D1 : array
+        Structure function, shape (nmasses, nbins); nan for empty bins.
+    """
+    masses = np.atleast_1d(np.asarray(masses, dtype=float))
+    bin_edges = np.asarray(bin_edges, dtype=float)
+    nbins = len(bin_edges) - 1
+
+    # lag of every GM/c^3 bin in hours for every mass, shape (nmasses, nbins_tg)
+    tlag_h = tgHours(masses)[:, None] * acc_tg.tlag[None, :]
+    ibin = np.searchsorted(bin_edges, tlag_h, side='right') - 1
+    ok = (ibin >= 0) & (ibin < nbins)
+
+    index = (ibin + (np.arange(len(masses)) * nbins)[:, None])[ok]
+    sums = np.bincount(index, weights=np.broadcast_to(acc_tg.sums, ok.shape)[ok],
+                       minlength=len(masses) * nbins)
+    counts = np.bincount(index, weights=np.broadcast_to(acc_tg.counts, ok.shape)[ok],
+                         minlength=len(masses) * nbins)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        D1 = (sums / counts).reshape(len(masses), nbins)
+    return 0.5 * (bin_edges[1:] + bin_edges[:-1]), D1
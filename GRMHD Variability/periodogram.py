@@ -0,0 +1,347 @@
+################################################################
+#
+# Power spectra of the EHT and GRMHD light curves
+#
+# - fast Lomb-Scargle periodogram (Press & Rybicki 1989) for the
+#   irregularly sampled SMA/ALMA light curves: the trigonometric
+#   sums are extirpolated onto a regular grid and evaluated with
+#   one FFT, so the cost is O(N log N) instead of O(N x Nfreq)
+# - batched FFT periodogram for the uniformly sampled simulation
+#   light curves, all models of the same length in one rfft call
+# - vectorized broken power-law fit of many spectra at once
+#
+# Frequencies are in 1/hour, powers are rms-normalized
+# (fractional variance per unit frequency) for the FFT spectra
+# and in the standard Lomb-Scargle normalization otherwise.
+#
+################################################################
+import numpy as np                     # imports library for math
+import matplotlib.pyplot as plt        # import library for plots
+from math import factorial
+
+
+def _extirpolate(x, y, N, M=4):
+    """
+    Extirpolate the values (x, y) onto the integer grid 0 ... N-1 such that
+    sum(y * f(x)) = sum(grid * f(range(N))) for any function f that is
+    well approximated by a polynomial of order M-1 (Press & Rybicki 1989).
+    """
+    x, y = np.broadcast_arrays(x, y)
+    result = np.zeros(N, dtype=y.dtype)
+
+    # points that fall exactly on the grid go there directly
+    integers = (x % 1 == 0)
+    np.add.at(result, x[integers].astype(int), y[integers])
+    x, y = x[~integers], y[~integers]
+
+    # Lagrange weights over the M grid points around every remaining x
+    ilo = np.clip((x - M // 2).astype(int), 0, N - M)
+    numerator = y * np.prod(x - ilo - np.arange(M)[:, None], axis=0)
+    denominator = factorial(M - 1)
+
+    for j in range(M):
+        if j > 0:
+            denominator *= j / (j - M)
+        ind = ilo + (M - 1 - j)
+        np.add.at(result, ind, numerator / (denominator * (x - ind)))
+    return result
+
+
+def _trig_sum(t, h, df, nfreq, f0=0., freq_factor=1, oversampling=5, Mfft=4):
+    """
+    Compute sum(h * sin(2 pi f t)) and sum(h * cos(2 pi f t)) for the
+    frequencies f = freq_factor * (f0 + df * arange(nfreq)) with one FFT.
+    """
+    df *= freq_factor
+    f0 *= freq_factor
+
+    t0 = t.min()
+    h = h.astype(complex)
+    if f0 > 0:
+        h = h * np.exp(2j * np.pi * f0 * (t - t0))
+
+    tnorm = ((t - t0) * df) % 1
+
+    # length of the FFT grid: next power of two above nfreq * oversampling
+    Nfft = 1 << int(np.ceil(np.log2(nfreq * oversampling)))
+    grid = _extirpolate(tnorm * Nfft, h, Nfft, Mfft)
+    fftgrid = np.fft.ifft(grid)[:nfreq] * Nfft
+
+    if t0 != 0:
+        f = f0 + df * np.arange(nfreq)
+        fftgrid *= np.exp(2j * np.pi * t0 * f)
+
+    return fftgrid.imag, fftgrid.real
+
+
+def fast_lombscargle(time, value, error=None, f0=None, df=None, nfreq=None,
+                     oversampling=5, Mfft=4):
+    """
+    Lomb-Scargle periodogram of an irregularly sampled light curve on the
+    regular frequency grid f0 + df * arange(nfreq), using the Press & Rybicki
+    extirpolation + FFT evaluation of the trigonometric sums.
+
+    Parameters
+    ----------
+    time, value : array-like
+        Times (hours) and fluxes of the measurements.
+    error : array-like or None, optional
+        Flux errors; used as 1/error^2 weights if given.
+    f0, df, nfreq : float, float, int, optional
+        Frequency grid in 1/hour. By default df = 1/(5 T) for a time span T,
+        f0 = df, and the grid extends to the mean Nyquist frequency.
+    oversampling, Mfft : int, optional
+        Oversampling of the FFT grid and order of the extirpolation.
+
+    Returns
+    -------
+    freq : array
+        Frequencies in 1/hour.
+    power : array
+        Lomb-Scargle power in the standard normalization (0 to 1).
+    """
+    time = np.asarray(time, dtype=float)
+    value = np.asarray(value, dtype=float)
+
+    if error is None:
+        w = np.ones_like(time)
+    else:
+        w = 1. / np.asarray(error, dtype=float)**2
+    w = w / w.sum()
+
+    span = time.max() - time.min()
+    if df is None:
+        df = 1. / (5. * span)
+    if f0 is None:
+        f0 = df
+    if nfreq is None:
+        nfreq = int(0.5 * len(time) / span / df)
+
+    y = value - np.dot(w, value)
+
+    kwds = dict(f0=f0, df=df, nfreq=nfreq, oversampling=oversampling, Mfft=Mfft)
+    Sh, Ch = _trig_sum(time, w * y, **kwds)
+    S2, C2 = _trig_sum(time, w, freq_factor=2, **kwds)
+
+    # phase offset tau of the Lomb-Scargle model
+    tan_2omega_tau = S2 / C2
+    S2w = tan_2omega_tau / np.sqrt(1 + tan_2omega_tau * tan_2omega_tau)
+    C2w = 1 / np.sqrt(1 + tan_2omega_tau * tan_2omega_tau)
+    Cw = np.sqrt(0.5) * np.sqrt(1 + C2w)
+    Sw = np.sqrt(0.5) * np.sign(S2w) * np.sqrt(1 - C2w)
+
+    YY = np.dot(w, y * y)
+    YC = Ch * Cw + Sh * Sw
+    YS = Sh * Cw - Ch * Sw
+    CC = 0.5 * (1 + C2 * C2w + S2 * S2w)
+    SS = 0.5 * (1 - C2 * C2w - S2 * S2w)
+
+    power = (YC * YC / CC + YS * YS / SS) / YY
+    freq = f0 + df * np.arange(nfreq)
+
+    return freq, power
+
+
+def fft_psd(flux, dt):
+    """
+    Rms-normalized periodogram of many uniformly sampled light curves of the
+    same length at once.
+
+    Parameters
+    ----------
+    flux : array
+        Light curves, shape (ncurves, nsamples).
+    dt : float
+        Sampling interval in hours.
+
+    Returns
+    -------
+    freq : array
+        Positive Fourier frequencies in 1/hour (zero frequency removed).
+    psd : array
+        Periodograms, shape (ncurves, nfreq), normalized such that their
+        integral over frequency gives the fractional variance.
+    """
+    flux = np.atleast_2d(np.asarray(flux, dtype=float))
+    nsamples = flux.shape[1]
+
+    mean = flux.mean(axis=1, keepdims=True)
+    ft = np.fft.rfft(flux - mean, axis=1)
+    freq = np.fft.rfftfreq(nsamples, dt)
+
+    psd = 2. * dt / nsamples * np.abs(ft)**2 / mean**2
+    return freq[1:], psd[:, 1:]
+
+
+def log_bin_spectra(freq, power, fbins):
+    """
+    Average many spectra in logarithmic frequency bins, averaging log10 of
+    the power (Papadakis & Lawrence 1993).
+
+    Parameters
+    ----------
+    freq : array
+        Frequencies of the spectra.
+    power : array
+        Spectra, shape (ncurves, nfreq).
+    fbins : array
+        Edges of the frequency bins.
+
+    Returns
+    -------
+    fcenters : array
+        Geometric centers of the bins.
+    logpower : array
+        Mean log10 power per bin, shape (ncurves, nbins); nan for empty bins.
+    """
+    power = np.atleast_2d(power)
+    ncurves = power.shape[0]
+    nbins = len(fbins) - 1
+
+    ibin = np.searchsorted(fbins, freq, side='right') - 1
+    inside = (ibin >= 0) & (ibin < nbins)
+    ibin = ibin[inside]
+
+    offsets = (np.arange(ncurves) * nbins)[:, None]
+    index = (ibin[None, :] + offsets).ravel()
+    with np.errstate(divide='ignore'):
+        logp = np.log10(power[:, inside])
+    sums = np.bincount(index, weights=logp.ravel(), minlength=ncurves * nbins)
+    counts = np.bincount(ibin, minlength=nbins)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        logpower = sums.reshape(ncurves, nbins) / counts
+
+    fcenters = np.sqrt(fbins[1:] * fbins[:-1])
+    return fcenters, logpower
+
+
+def grid_psd(flux, dt, nsamp, fbins):
+    """
+    Rms-normalized periodograms of a nan-padded models x samples grid
+    (see Simulations/readsim.py), binned onto common logarithmic bins.
+
+    Models of the same length are transformed together in one rfft call.
+
+    Returns
+    -------
+    fcenters : array
+        Geometric centers of the frequency bins.
+    logpower : array
+        Mean log10 power per bin, shape (nmodels, nbins).
+    """
+    flux = np.atleast_2d(flux)
+    nsamp = np.asarray(nsamp)
+    logpower = np.full((flux.shape[0], len(fbins) - 1), np.nan)
+
+    for n in np.unique(nsamp):
+        rows = np.flatnonzero(nsamp == n)
+        freq, psd = fft_psd(flux[rows, :n], dt)
+        fcenters, logpower[rows] = log_bin_spectra(freq, psd, fbins)
+
+    return np.sqrt(fbins[1:] * fbins[:-1]), logpower
+
+
+def fit_broken_powerlaw(freq, logpower, nbreak=40):
+    """
+    Fit a continuous broken power law to many log10 spectra at once.
+
+    The model is log10 P = c - alpha_low * min(x - xb, 0) - alpha_high * max(x - xb, 0)
+    with x = log10 f. For a fixed break xb it is linear in (c, alpha_low,
+    alpha_high), so all spectra and all trial breaks are solved together as
+    stacked 3x3 least-squares problems and the best break is kept.
+
+    Parameters
+    ----------
+    freq : array
+        Frequencies, shared by all spectra.
+    logpower : array
+        log10 power, shape (ncurves, nfreq); nan values are ignored.
+    nbreak : int, optional
+        Number of trial break frequencies, spaced logarithmically over the
+        inner 80% of the frequency range.
+
+    Returns
+    -------
+    fit : dict of arrays, one entry per spectrum
+        'norm' (log10 power at the break), 'alpha_low', 'alpha_high',
+        'fbreak', 'rms' (rms residual in dex).
+    """
+    logpower = np.atleast_2d(logpower)
+    x = np.log10(freq)
+    good = np.isfinite(logpower)
+    y = np.where(good, logpower, 0.)
+    w = good.astype(float)
+
+    lo, hi = np.percentile(x, [10., 90.])
+    xb = np.linspace(lo, hi, nbreak)
+
+    # design matrices of every trial break, shape (nbreak, nfreq, 3)
+    dx = x[None, :] - xb[:, None]
+    A = np.stack([np.ones_like(dx), -np.minimum(dx, 0.), -np.maximum(dx, 0.)], axis=-1)
+
+    # normal equations for every (curve, break), shape (ncurves, nbreak, 3, 3)
+    AtWA = np.einsum('bfi,nf,bfj->nbij', A, w, A)
+    AtWy = np.einsum('bfi,nf->nbi', A, w * y)
+    AtWA += 1e-12 * np.eye(3)
+    beta = np.linalg.solve(AtWA, AtWy[..., None])[..., 0]
+
+    model = np.einsum('bfi,nbi->nbf', A, beta)
+    chi2 = (w[:, None, :] * (y[:, None, :] - model)**2).sum(axis=2)
+
+    best = np.argmin(chi2, axis=1)
+    rows = np.arange(logpower.shape[0])
+    coef = beta[rows, best]
+
+    return {'norm': coef[:, 0],
+            'alpha_low': coef[:, 1],
+            'alpha_high': coef[:, 2],
+            'fbreak': 10**xb[best],
+            'rms': np.sqrt(chi2[rows, best] / np.maximum(w.sum(axis=1), 1.))}
+
+
+if __name__ == "__main__":
+    from EHT_Data.Plots.readarray import readAllArrays
+    from Simulations.readsim import readSimGrid, TUNIT_HOURS
+
+    # common logarithmic frequency bins (1/hour)
+    fbins = np.logspace(-2, 1.5, 36)
+
+    # simulations: every model in one sweep
+    params, ctime, flux, nsamp = readSimGrid()
+    fsim, logp_sim = grid_psd(flux, TUNIT_HOURS, nsamp, fbins)
+    fit_sim = fit_broken_powerlaw(fsim, logp_sim)
+
+    # EHT: Lomb-Scargle of every day/array/band on a common frequency grid
+    alldata = readAllArrays()
+    keys = sorted(alldata)
+    logp_eht = np.full((len(keys), len(fbins) - 1), np.nan)
+    for ikey, key in enumerate(keys):
+        ctimeE, fluxE, errE = alldata[key]
+        freq, power = fast_lombscargle(ctimeE, fluxE, errE, f0=0.05, df=0.01, nfreq=2000)
+        feht, logp_eht[ikey] = log_bin_spectra(freq, power, fbins)
+    fit_eht = fit_broken_powerlaw(feht, logp_eht)
+
+    for ikey, key in enumerate(keys):
+        print(key, f"fbreak={fit_eht['fbreak'][ikey]:.3f}/h",
+              f"alpha={fit_eht['alpha_low'][ikey]:.2f},{fit_eht['alpha_high'][ikey]:.2f}")
+
+    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(9, 4.5))
+    ax1.plot(fsim, 10**logp_sim.T, '-', lw=0.5, alpha=0.3)
+    ax1.set_title("Simulation Data")
+    ax2.plot(feht, 10**logp_eht.T, '-', lw=0.8)
+    ax2.set_title("EHT Data (Lomb-Scargle)")
+    for ax in (ax1, ax2):
+        ax.set_xscale('log')
+        ax.set_yscale('log')
+        ax.set_xlabel('Frequency (1/hr)')
+    ax1.set_ylabel('Power')
+
+    fig2, ax3 = plt.subplots(figsize=(5, 4.5))
+    ax3.hist(fit_sim['alpha_high'], 25, histtype='step', lw=2, label='Simulations')
+    ax3.hist(fit_eht['alpha_high'], 10, histtype='step', lw=2, label='EHT')
+    ax3.set_xlabel(r'High-frequency slope')
+    ax3.legend(frameon=False)
+
+    plt.tight_layout()
+    plt.show()
@@ -0,0 +1,80 @@
+import numpy as np                     # imports library for math
+import matplotlib.pyplot as plt        # import library for plots
+from sfgrid import load_sim_sf, load_eht_sf, interp_sf, group_means, PARAM_KEYS
+
+
+###############################
+#   Lag grid
+###############################
+
+# time lags in hours at which the structure functions are compared
+# (replaces running plot_parameters.py once per deltaTau)
+lags = np.geomspace(0.15, 5.0, 80)
+
+#################################
+#  Reading Simulation and EHT data
+#################################
+
+params, sim_curves = load_sim_sf()
+eht_labels, eht_curves = load_eht_sf()
+
+# every model and every EHT day on the common lag grid, once
+simD1 = interp_sf(sim_curves, lags)     # models x lags
+ehtD1 = interp_sf(eht_curves, lags)     # days x lags
+
+# EHT band at every lag
+with np.errstate(all='ignore'):
+    eht_lo = np.nanmin(ehtD1, axis=0)
+    eht_hi = np.nanmax(ehtD1, axis=0)
+
+# which models fall inside the EHT band, at every lag
+inside = (simD1 >= eht_lo) & (simD1 <= eht_hi)
+
+# per-parameter trend: mean log10 D1 of the models sharing a parameter
+# value, relative to the mean over all models at the same lag
+logD1 = np.log10(simD1)
+all_mean = np.nanmean(logD1, axis=0)
+
+print("Models inside the EHT band:")
+for lag_show in [0.3, 0.5, 1.0, 2.0]:
+    ilag = np.argmin(np.abs(lags - lag_show))
+    print(f"  tau={lags[ilag]:.2f} hr: {np.count_nonzero(inside[:, ilag])}/{len(simD1)}")
+
+#################################
+#  Heatmaps (parameter x lag)
+#################################
+
+titles = {'field': 'Magnetic Field Type (S/M)', 'incl': 'Inclination (degrees)',
+          'bhspin': 'Black Hole Spin', 'Rratio': 'Rratio'}
+
+fig, axes = plt.subplots(2, 4, figsize=(15, 6.5), sharex=True)
+
+for icol, key in enumerate(PARAM_KEYS):
+    values, trend = group_means(params[key], logD1)
+    _, frac_inside = group_means(params[key], inside.astype(float))
+    trend = trend - all_mean
+
+    ylabels = [str(v) for v in values]
+    yedges = np.arange(len(values) + 1) - 0.5
+    lag_edges = np.sqrt(lags[1:] * lags[:-1])
+    lag_edges = np.concatenate(([lags[0]**2 / lag_edges[0]], lag_edges, [lags[-1]**2 / lag_edges[-1]]))
+
+    ax = axes[0, icol]
+    vmax = np.nanmax(np.abs(trend))
+    mesh = ax.pcolormesh(lag_edges, yedges, trend, cmap='RdBu_r', vmin=-vmax, vmax=vmax)
+    fig.colorbar(mesh, ax=ax, label=r'$\Delta \log D^1$')
+    ax.set_title(f'Trend vs {titles[key]}', fontsize=9)
+
+    ax = axes[1, icol]
+    mesh = ax.pcolormesh(lag_edges, yedges, frac_inside, cmap='viridis', vmin=0, vmax=1)
+    fig.colorbar(mesh, ax=ax, label='Fraction in EHT band')
+    ax.set_xlabel(r'$\tau$ (hours)')
+
+    for ax in axes[:, icol]:
+        ax.set_xscale('log')
+        ax.set_yticks(np.arange(len(values)))
+        ax.set_yticklabels(ylabels)
+        ax.set_ylabel(titles[key], fontsize=8)
+
+plt.tight_layout()
+plt.show()
@@ -4,6 +4,9 @@ from scipy import stats                # import binning statistics
 from matplotlib import rcParams        # import to change plot parameters
 import pandas as pd                    # import pandas for reading data
 from EHT_Data.Plots.readarray import readSMA, readALMA
+from sfaccum import SFAccumulator
+from massscale import sf_in_hours
+from Simulations.readsim import FRAME_TG, SGRA_MASS
 
 ###################################
 #   EHT scatter+line plot style 
@@ -85,38 +88,15 @@ def sliding_structFunc_opt(time, value, error=None, dt0=None, dt_max=None):
     if dt_max is None:
         dt_max = np.max(time) - np.min(time)
     
-    # create target Δt values
-    target_dts = np.arange(0, dt_max + dt0, dt0)
-    
-    #create array to store the Structure Function values
-    D1 = np.zeros(len(target_dts))
+    # accumulate the squared differences of all pairs in sliding windows
+    # of width dt0 centered on the target Δt values 0, dt0, 2*dt0, ...
+    acc = SFAccumulator(dt0=dt0, dt_max=dt_max, keep_samples=False)
+    acc.update(time, value)
+    target_dts, D1 = acc.result()
     
     #optional error array
     sigmaD1 = np.zeros(len(target_dts)) if error is not None else None
 
-    # Normalize error if provided
-    if error is not None:
-        error = np.array(error) / np.mean(value)
-        ave_error = np.mean(error)
-
-    # Loop over target Δt values
-    for idx, dt in enumerate(target_dts):
-        diffs = []
-
-        # Loop over all pairs (i < j)
-        #stores the squared differences for pairs within the sliding window
-        for i in range(N):
-            for j in range(i + 1, N):
-                tau = np.abs(time[j] - time[i])
-                if dt - dt0/2 <= tau <= dt + dt0/2:
-                    diffs.append((value[j] - value[i])**2)
-
-        if diffs:
-            D_val = np.mean(diffs)
-            D1[idx] = D_val
-        else:
-            D1[idx] = np.nan
-
     return target_dts, D1, sigmaD1
 
 
@@ -129,13 +109,6 @@ fieldall=['S','M']
 bhallspin=[-0.94,-0.5,0.0,0.5,0.94]
 Rratioall=[10,40,160]
 
-#Need to collect 0.94 inclinations for MAD and SANE
-
-inclinationsall=['10.0','30.0','50.0','70.0']
-fieldall=['S','M']
-bhallspin=[0.94]
-Rratioall=[10,40,160]
-
 for field in fieldall:
     for incl in inclinationsall:
         for bhspin in bhallspin:
@@ -152,26 +125,35 @@ for field in fieldall:
                 # read all the data
                 alldata=np.genfromtxt(infile)
                 
-                # first column is time in 5M, which is 0.00588 hrs for Sgr A* (@4.3 10^6 Msun)
-                ctime=(alldata[:,0]-alldata[0,0])*0.02942
+                # first column is the frame number, one frame is FRAME_TG=5 GM/c^3;
+                # the structure function is computed in units of GM/c^3 so it
+                # can be converted to hours for any black-hole mass later
+                ctime_tg=(alldata[:,0]-alldata[0,0])*FRAME_TG
                 # next column is flux
                 flux=alldata[:,1]
                 
                 # thining
                 thin=5
-                ctime=ctime[::thin]
+                ctime_tg=ctime_tg[::thin]
                 flux=flux[::thin]
                 
-                # make a set of equdistant bins between 0 and 8 hours
-                tlag, D1, sigmad1 = sliding_structFunc_opt(ctime, flux, error=None, dt0=None, dt_max=None)
+                # accumulate the structure function in bins of one thinned frame
+                acc_tg=SFAccumulator(dt0=ctime_tg[1]-ctime_tg[0], dt_max=ctime_tg[-1], keep_samples=False)
+                acc_tg.update(ctime_tg, flux)
+                
+                # lags in hours for Sgr A* (@4.3 10^6 Msun)
+                tlag, D1 = sf_in_hours(acc_tg, SGRA_MASS)
                 
-                np.savez(outfile,
-                         field=field,
-                         inclination=float(incl),
-                         bhspin=bhspin,
-                         Rratio=Rratio,
-                         tlag=tlag,
-                         D1=D1)
+                # store the GM/c^3 bins with their sums and pair counts, plus
+                # tlag (hours) and D1 for the mass of Sgr A*
+                acc_tg.save(outfile,
+                            field=field,
+                            inclination=float(incl),
+                            bhspin=bhspin,
+                            Rratio=Rratio,
+                            tlag=tlag,
+                            D1=D1,
+                            mass=SGRA_MASS)
                                 
                 print(field,incl,bhspin,Rratio)
                 ax1.plot(tlag, D1, linestyle='-', alpha=0.2)
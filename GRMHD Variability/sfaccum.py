@@ -0,0 +1,254 @@
+################################################################
+#
+# Mergeable first-order structure function accumulator
+#
+# Instead of the finished mean D1 in every lag bin, the accumulator
+# keeps the sum, the sum of squares and the number of pairs of the
+# squared flux differences in every bin. Those add up, so
+#
+# - update(time, value) adds new samples (e.g. a new observing day)
+#   and only forms the pairs that involve the new samples,
+# - merge(other) combines accumulators built separately, e.g. for
+#   chunks of a long light curve processed by different workers,
+# - result() turns the sums into the same (tlag, D1) as
+#   sliding_structFunc_opt in plotsf.py, at any time.
+#
+# Pairs are formed with array broadcasting in row blocks and binned
+# with np.bincount.
+#
+# Usage:
+#   acc = SFAccumulator(dt0=0.0147, dt_max=8.)
+#   acc.update(ctime_day1, flux_day1)
+#   acc.update(ctime_day2, flux_day2)
+#   tlag, D1 = acc.result()
+#
+################################################################
+import numpy as np                     # imports library for math
+
+# largest number of pairs formed at once
+MAX_BLOCK_PAIRS = 2**22
+
+
+class SFAccumulator:
+    """
+    Per-lag-bin sums of squared flux differences.
+
+    Parameters
+    ----------
+    bin_edges : array-like, optional
+        Edges of the lag bins. If None, the bins of sliding_structFunc_opt
+        are used: centered on 0, dt0, 2 dt0, ... up to dt_max, width dt0.
+    dt0, dt_max : float, optional
+        Bin width and largest lag center if `bin_edges` is not given.
+    keep_samples : bool, optional
+        Keep the samples so that later updates and merges can form the
+        cross pairs with them. Without them, update() and merge() only add
+        the pairs within the new data (enough for independent data sets
+        such as separate days when only lags within a day matter).
+    """
+
+    def __init__(self, bin_edges=None, dt0=None, dt_max=None, keep_samples=True):
+        if bin_edges is None:
+            if dt0 is None or dt_max is None:
+                raise ValueError("Give either bin_edges or both dt0 and dt_max.")
+            centers = np.arange(0, dt_max + dt0, dt0)
+            bin_edges = np.append(centers - dt0 / 2., centers[-1] + dt0 / 2.)
+
+        self.bin_edges = np.asarray(bin_edges, dtype=float)
+        nbins = len(self.bin_edges) - 1
+
+        self.sums = np.zeros(nbins)
+        self.sumsq = np.zeros(nbins)
+        self.counts = np.zeros(nbins, dtype=np.int64)
+
+        self.keep_samples = keep_samples
+        self.time = np.empty(0)
+        self.value = np.empty(0)
+
+    @classmethod
+    def from_lightcurve(cls, time, value, dt0=None, dt_max=None, **kwargs):
+        """
+        Accumulator of a single light curve, with the default bins of
+        sliding_structFunc_opt (dt0 = smallest sampling interval,
+        dt_max = time span).
+        """
+        time = np.asarray(time, dtype=float)
+        if dt0 is None:
+            dt0 = np.min(np.diff(np.sort(time)))
+        if dt_max is None:
+            dt_max = np.max(time) - np.min(time)
+        acc = cls(dt0=dt0, dt_max=dt_max, **kwargs)
+        acc.update(time, value)
+        return acc
+
+    @property
+    def nbins(self):
+        return len(self.counts)
+
+    @property
+    def tlag(self):
+        return 0.5 * (self.bin_edges[1:] + self.bin_edges[:-1])
+
+    def _add_pairs(self, time1, value1, time2=None, value2=None):
+        """
+        Add the pairs (i<j) within one set of samples, or all the cross
+        pairs between two sets, to the bins.
+        """
+        same = time2 is None
+        if same:
+            time2, value2 = time1, value1
+
+        lag_max = self.bin_edges[-1]
+        block = max(1, MAX_BLOCK_PAIRS // max(len(time2), 1))
+
+        for start in range(0, len(time1), block):
+            t1 = time1[start:start + block, None]
+            v1 = value1[start:start + block, None]
+
+            lag = np.abs(time2[None, :] - t1)
+            use = lag < lag_max
+            if same:
+                # each pair once: j > i
+                use &= np.arange(len(time2))[None, :] > np.arange(start, start + len(t1))[:, None]
+
+            ii, jj = np.nonzero(use)
+            ibin = np.searchsorted(self.bin_edges, lag[ii, jj], side='right') - 1
+            ok = (ibin >= 0) & (ibin < self.nbins)
+            ibin = ibin[ok]
+            diff2 = (value2[jj[ok]] - v1[ii[ok], 0])**2
+
+            self.sums += np.bincount(ibin, weights=diff2, minlength=self.nbins)
+            self.sumsq += np.bincount(ibin, weights=diff2 * diff2, minlength=self.nbins)
+            self.counts += np.bincount(ibin, minlength=self.nbins)
+
+    def update(self, time, value):
+        """
+        Add new samples: the pairs among them and, if samples are kept,
+        the cross pairs with the samples already accumulated.
+        """
+        time = np.asarray(time, dtype=float)
+        value = np.asarray(value, dtype=float)
+
+        self._add_pairs(time, value)
+        if self.keep_samples and len(self.time) > 0:
+            self._add_pairs(time, value, self.time, self.value)
+
+        if self.keep_samples:
+            self.time = np.concatenate((self.time, time))
+            self.value = np.concatenate((self.value, value))
+        return self
+
+    def merge(self, other, cross=True):
+        """
+        Add the bins of another accumulator with the same lag bins. If both
+        keep their samples and `cross` is True, the pairs between the two
+        sets of samples are added as well, so merging the accumulators of
+        two chunks gives the accumulator of the whole light curve.
+        """
+        if not np.array_equal(self.bin_edges, other.bin_edges):
+            raise ValueError("Cannot merge accumulators with different lag bins.")
+
+        if cross and self.keep_samples and other.keep_samples \
+                and len(self.time) > 0 and len(other.time) > 0:
+            self._add_pairs(other.time, other.value, self.time, self.value)
+
+        self.sums += other.sums
+        self.sumsq += other.sumsq
+        self.counts += other.counts
+
+        if self.keep_samples:
+            self.time = np.concatenate((self.time, other.time))
+            self.value = np.concatenate((self.value, other.value))
+        return self
+
+    def __add__(self, other):
+        return self.copy().merge(other)
+
+    def copy(self):
+        new = SFAccumulator(self.bin_edges, keep_samples=self.keep_samples)
+        new.sums = self.sums.copy()
+        new.sumsq = self.sumsq.copy()
+        new.counts = self.counts.copy()
+        new.time = self.time.copy()
+        new.value = self.value.copy()
+        return new
+
+    def scaled(self, factor):
+        """
+        The same accumulator with every lag multiplied by `factor`, e.g. to
+        convert lags from GM/c^3 to hours. Only the bin edges change; the
+        sums and pair counts move with them unchanged.
+        """
+        new = self.copy()
+        new.bin_edges = self.bin_edges * factor
+        new.time = self.time * factor
+        return new
+
+    def rebinned(self, bin_edges):
+        """
+        Combine the bins onto coarser lag bins `bin_edges`: every bin goes,
+        with its sums and pair counts, into the new bin holding its center.
+        Samples are dropped.
+        """
+        new = SFAccumulator(bin_edges, keep_samples=False)
+        ibin = np.searchsorted(new.bin_edges, self.tlag, side='right') - 1
+        ok = (ibin >= 0) & (ibin < new.nbins)
+        new.sums = np.bincount(ibin[ok], weights=self.sums[ok], minlength=new.nbins)
+        new.sumsq = np.bincount(ibin[ok], weights=self.sumsq[ok], minlength=new.nbins)
+        new.counts = np.bincount(ibin[ok], weights=self.counts[ok], minlength=new.nbins).astype(np.int64)
+        return new
+
+    def result(self, errors=False):
+        """
+        Structure function from the accumulated sums.
+
+        Returns
+        -------
+        tlag : array
+            Centers of the lag bins.
+        D1 : array
+            Mean squared difference in every bin (nan for empty bins).
+        sigmaD1 : array, only if `errors` is True
+            Standard error of D1 from the scatter of the squared differences.
+        """
+        with np.errstate(invalid='ignore', divide='ignore'):
+            D1 = self.sums / self.counts
+            if not errors:
+                return self.tlag, D1
+            var = np.maximum(self.sumsq / self.counts - D1**2, 0.)
+            sigmaD1 = np.sqrt(var / self.counts)
+        return self.tlag, D1, sigmaD1
+
+    def save(self, fname, **extra):
+        """
+        Save the bins (and samples if kept) to an npz file; extra keyword
+        arguments are stored alongside, as in the _sf.npz files, and may
+        replace the default tlag and D1 (e.g. with lags in other units).
+        """
+        tlag, D1 = self.result()
+        payload = dict(tlag=tlag, D1=D1)
+        payload.update(extra)
+        np.savez(fname, bin_edges=self.bin_edges, sums=self.sums, sumsq=self.sumsq,
+                 counts=self.counts, sample_time=self.time, sample_value=self.value,
+                 keep_samples=self.keep_samples, **payload)
+
+    @classmethod
+    def load(cls, fname):
+        """
+        Read an accumulator written by save().
+
+        Older _sf.npz files hold only the binned tlag and D1, without the
+        sums and pair counts, and cannot be rescaled or merged; they raise a
+        ValueError asking to regenerate them with plotsf.py.
+        """
+        data = np.load(fname)
+        if "bin_edges" not in data.files:
+            raise ValueError(f"{fname} holds only tlag and D1 (written by an older plotsf.py), "
+                             "not the accumulated sums and pair counts; regenerate it with plotsf.py")
+        acc = cls(data["bin_edges"], keep_samples=bool(data["keep_samples"]))
+        acc.sums = data["sums"].astype(float)
+        acc.sumsq = data["sumsq"].astype(float)
+        acc.counts = data["counts"].astype(np.int64)
+        acc.time = data["sample_time"]
+        acc.value = data["sample_value"]
+        return acc
@@ -0,0 +1,129 @@
+################################################################
+#
+# Structure functions of the whole simulation grid and of the EHT
+# data as arrays on a common lag grid
+#
+# The _sf.npz files written by plotsf.py have their own lag axis
+# for every model (the models have different lengths). They are
+# read once and interpolated onto a common lag grid, so that any
+# lag can be looked up for all models with array indexing instead
+# of an argmin per model per file.
+#
+################################################################
+import os                              # import library for file paths
+import numpy as np                     # imports library for math
+from Simulations.readsim import (simFilename, fieldall, inclinationsall,
+                                 bhallspin, Rratioall, SIMDIR)
+
+# directory holding the SMAnpz/ and ALMAnpz/ subdirectories
+EHTDIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'EHT_Data')
+
+# the parameters of a model, in the order used for the grid
+PARAM_KEYS = ('field', 'incl', 'bhspin', 'Rratio')
+
+
+def load_sim_sf(simdir=SIMDIR, fields=fieldall, inclinations=inclinationsall,
+                bhspins=bhallspin, Rratios=Rratioall):
+    """
+    Read the structure function of every model of the simulation grid.
+
+    Returns
+    -------
+    params : dict of arrays
+        'field', 'incl', 'bhspin', 'Rratio' of every model.
+    curves : list of (tlag, D1) tuples
+        Structure function of every model, in the same order.
+    """
+    params = {key: [] for key in PARAM_KEYS}
+    curves = []
+    for field in fields:
+        for incl in inclinations:
+            for bhspin in bhspins:
+                for Rratio in Rratios:
+                    infile = simFilename(field, incl, bhspin, Rratio, simdir,
+                                         suffix='_sf.npz', subdirsuffix='npz')
+                    data = np.load(infile)
+                    curves.append((data["tlag"], data["D1"]))
+
+                    params['field'].append(field)
+                    params['incl'].append(float(incl))
+                    params['bhspin'].append(bhspin)
+                    params['Rratio'].append(Rratio)
+
+    return {key: np.array(val) for key, val in params.items()}, curves
+
+
+def load_eht_sf(ehtdir=EHTDIR, arrays=('SMA', 'ALMA')):
+    """
+    Read the structure functions of every EHT day found in the
+    <array>npz/ directories.
+
+    Returns
+    -------
+    labels : list of str
+        e.g. 'SMA Apr05'.
+    curves : list of (tlag, D1) tuples
+    """
+    labels = []
+    curves = []
+    for array in arrays:
+        npzdir = os.path.join(ehtdir, array + 'npz')
+        if not os.path.isdir(npzdir):
+            continue
+        for fname in sorted(os.listdir(npzdir)):
+            if not fname.endswith('_sf.npz'):
+                continue
+            data = np.load(os.path.join(npzdir, fname))
+            labels.append(array + ' ' + fname[len(array) + 1:-len('_sf.npz')])
+            curves.append((data["tlag"], data["D1"]))
+    return labels, curves
+
+
+def interp_sf(curves, lags):
+    """
+    Interpolate many structure functions onto a common lag grid.
+
+    log10 D1 is interpolated linearly in lag between the finite, positive
+    values of each curve; lags outside a curve's range are nan.
+
+    Parameters
+    ----------
+    curves : list of (tlag, D1) tuples
+    lags : array
+        Common lag grid.
+
+    Returns
+    -------
+    D1 : array
+        Shape (ncurves, nlags).
+    """
+    lags = np.atleast_1d(np.asarray(lags, dtype=float))
+    out = np.full((len(curves), len(lags)), np.nan)
+    for icurve, (tlag, D1) in enumerate(curves):
+        good = np.isfinite(D1) & (D1 > 0)
+        if np.count_nonzero(good) < 2:
+            continue
+        out[icurve] = 10**np.interp(lags, tlag[good], np.log10(D1[good]),
+                                    left=np.nan, right=np.nan)
+    return out
+
+
+def group_means(values, data):
+    """
+    Average the rows of `data` (nmodels x nlags) over the models that share
+    each distinct value of `values`, ignoring nan.
+
+    Returns
+    -------
+    uvalues : array
+        The distinct values.
+    means : array
+        Shape (nvalues, nlags).
+    """
+    uvalues, inverse = np.unique(values, return_inverse=True)
+    onehot = (inverse[None, :] == np.arange(len(uvalues))[:, None]).astype(float)
+    good = np.isfinite(data)
+    sums = onehot @ np.where(good, data, 0.)
+    counts = onehot @ good
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return uvalues, sums / counts
@@ -0,0 +1,275 @@
+################################################################
+#
+# Synthetic red-noise light curves
+#
+# Ensembles of stochastic light curves for scale tests of the SF,
+# FSD and PSD code and as null hypotheses for the observed
+# variability:
+#
+# - damped random walk (DRW, Ornstein-Uhlenbeck process) with
+#   damping time tau, exact at arbitrary sampling times
+# - power-law red noise P(f) ~ f^-beta (Timmer & Koenig 1995),
+#   generated on a long regular grid to include the power below
+#   the lowest sampled frequency
+#
+# All curves of an ensemble are generated as one array, with a
+# seed, either on the uniform cadence of the _var.out files
+# (synth_grid: same output as readSimGrid) or at the time stamps
+# of the SMA/ALMA light curves (synth_eht: same keys as
+# readAllArrays, with a realizations x samples flux array).
+#
+# Usage:
+#   params, ctime, flux, nsamp = synth_grid('drw', 5000, tau=2.0, seed=1)
+#   fsds = fracStdDevAll((ctime, flux), intervals)
+#
+################################################################
+import numpy as np                     # imports library for math
+from EHT_Data.Plots.readarray import readAllArrays
+from Simulations.readsim import TUNIT_HOURS
+
+# largest number of grid values generated at once for power-law noise
+MAX_BATCH_VALUES = 2**24
+
+
+def drw_lightcurves(time, ncurves, tau, rng):
+    """
+    Zero-mean, unit-variance damped random walks at the times `time`.
+
+    The process is stationary: the first sample is drawn from the
+    stationary distribution and every later one from the exact conditional
+    distribution given the previous sample, so arbitrary (irregular)
+    sampling needs no approximation.
+
+    Parameters
+    ----------
+    time : array
+        Sampling times, in the units of `tau`.
+    ncurves : int
+        Number of independent realizations.
+    tau : float or array
+        Damping time, scalar or one per realization.
+    rng : numpy.random.Generator
+        Random number generator.
+
+    Returns
+    -------
+    x : array, shape (ncurves, len(time))
+    """
+    time = np.asarray(time, dtype=float)
+    order = np.argsort(time, kind='stable')
+    tau = np.broadcast_to(np.asarray(tau, dtype=float), (ncurves,))
+
+    # decay factor of every step for every realization
+    decay = np.exp(-np.diff(time[order])[None, :] / tau[:, None])
+    kick = np.sqrt(1. - decay**2)
+
+    x = rng.standard_normal((ncurves, len(time)))
+    for i in range(1, len(time)):
+        x[:, i] = decay[:, i - 1] * x[:, i - 1] + kick[:, i - 1] * x[:, i]
+
+    out = np.empty_like(x)
+    out[:, order] = x
+    return out
+
+
+def powerlaw_lightcurves(time, ncurves, beta, rng, dt=None, extend=10, fbreak=None):
+    """
+    Zero-mean, unit-variance power-law red noise at the times `time`.
+
+    The noise is generated with random Fourier amplitudes and phases
+    (Timmer & Koenig 1995) on a regular grid of spacing `dt` that is
+    `extend` times longer than the sampled span, normalized to unit
+    variance over the whole grid and read off at the grid points nearest
+    to the sampling times. The variance within the sampled span therefore
+    scatters from curve to curve as it does for real red noise.
+
+    Parameters
+    ----------
+    time : array
+        Sampling times.
+    ncurves : int
+        Number of independent realizations.
+    beta : float
+        Power-law index, P(f) ~ f^-beta.
+    rng : numpy.random.Generator
+        Random number generator.
+    dt : float, optional
+        Grid spacing; the median sampling interval by default.
+    extend : float, optional
+        Length of the generated grid in units of the sampled span.
+    fbreak : float, optional
+        Frequency below which the spectrum is flat (in 1/units of time).
+
+    Returns
+    -------
+    x : array, shape (ncurves, len(time))
+    """
+    time = np.asarray(time, dtype=float)
+    if dt is None:
+        dt = np.median(np.diff(np.sort(time)))
+    span = np.ptp(time)
+
+    ngrid = int(np.ceil(extend * span / dt)) + 1
+    ngrid += ngrid % 2
+    igrid = np.rint((time - time.min()) / dt).astype(int)
+
+    freq = np.fft.rfftfreq(ngrid, dt)[1:]
+    if fbreak is not None:
+        freq = np.maximum(freq, fbreak)
+    amplitude = freq**(-beta / 2.)
+    amplitude[-1] /= np.sqrt(2.)   # Nyquist term is real
+
+    x = np.empty((ncurves, len(time)))
+    batch = max(1, MAX_BATCH_VALUES // ngrid)
+    for start in range(0, ncurves, batch):
+        n = min(batch, ncurves - start)
+        coef = np.zeros((n, len(freq) + 1), dtype=complex)
+        coef[:, 1:] = amplitude * (rng.standard_normal((n, len(freq)))
+                                   + 1j * rng.standard_normal((n, len(freq))))
+        coef[:, -1] = coef[:, -1].real * np.sqrt(2.)
+        grid = np.fft.irfft(coef, ngrid, axis=1)
+        grid /= grid.std(axis=1, keepdims=True)
+        x[start:start + n] = grid[:, igrid]
+    return x
+
+
+def _lightcurves(model, time, ncurves, rng, rms, mean, lognormal, **kwargs):
+    """
+    Realizations of `model` ('drw' or 'powerlaw') turned into fluxes with
+    the given mean and fractional rms.
+    """
+    if model == 'drw':
+        x = drw_lightcurves(time, ncurves, kwargs.pop('tau'), rng, **kwargs)
+    elif model == 'powerlaw':
+        x = powerlaw_lightcurves(time, ncurves, kwargs.pop('beta'), rng, **kwargs)
+    else:
+        raise ValueError(f"Unknown light curve model: {model}")
+
+    rms = np.broadcast_to(np.asarray(rms, dtype=float), (ncurves,))[:, None]
+    if lognormal:
+        # positive fluxes with the requested mean and fractional rms
+        s = np.sqrt(np.log1p(rms**2))
+        return mean * np.exp(s * x - s**2 / 2.)
+    return mean * (1. + rms * x)
+
+
+def synth_grid(model, ncurves, nsamp=1000, dt=TUNIT_HOURS, rms=0.1, mean=1.,
+               lognormal=True, seed=None, **kwargs):
+    """
+    Ensemble of synthetic light curves with the uniform cadence of the
+    simulation library.
+
+    Parameters
+    ----------
+    model : {'drw', 'powerlaw'}
+        Stochastic process; its parameters (`tau` in hours, or `beta` and
+        optionally `fbreak`, `extend`) are passed as keyword arguments.
+        `tau` may hold one value per curve.
+    ncurves : int
+        Number of light curves.
+    nsamp : int, optional
+        Samples per light curve.
+    dt : float, optional
+        Sampling interval in hours (one _var.out frame by default).
+    rms : float or array, optional
+        Fractional rms variability, scalar or one per curve.
+    mean : float, optional
+        Mean flux in Jy.
+    lognormal : bool, optional
+        Exponentiate the Gaussian process so fluxes stay positive.
+    seed : int or None, optional
+        Seed of the random number generator.
+
+    Returns
+    -------
+    params, ctime, flux, nsamp :
+        As returned by readSimGrid; every params entry holds the model
+        name and its parameters for that curve.
+    """
+    rng = np.random.default_rng(seed)
+    ctime = np.arange(nsamp) * dt
+    flux = _lightcurves(model, ctime, ncurves, rng, rms, mean, lognormal, **kwargs)
+
+    rms_each = np.broadcast_to(np.asarray(rms, dtype=float), (ncurves,))
+    per_curve = {k: np.broadcast_to(np.asarray(v), (ncurves,)) for k, v in kwargs.items()}
+    params = [dict({'model': model, 'rms': float(rms_each[i])},
+                   **{k: v[i].item() for k, v in per_curve.items()}) for i in range(ncurves)]
+
+    return params, ctime, flux, np.full(ncurves, nsamp)
+
+
+def synth_eht(model, ncurves, alldata=None, rms=0.1, mean=None, lognormal=True,
+              seed=None, **kwargs):
+    """
+    Ensembles of synthetic light curves at the time stamps of the SMA/ALMA
+    light curves.
+
+    Parameters
+    ----------
+    model : {'drw', 'powerlaw'}
+        Stochastic process and its keyword parameters, as in synth_grid.
+    ncurves : int
+        Number of realizations per observed light curve.
+    alldata : dict, optional
+        Observed light curves keyed by (array, band, day), as returned by
+        readAllArrays (read from EHT_Data if None).
+    rms : float or array, optional
+        Fractional rms variability.
+    mean : float, optional
+        Mean flux in Jy; the mean of each observed light curve by default.
+    lognormal : bool, optional
+        Exponentiate the Gaussian process so fluxes stay positive.
+    seed : int or None, optional
+        Seed of the random number generator.
+
+    Returns
+    -------
+    synth : dict
+        Same keys as `alldata`, each holding (ctime, flux) with flux of
+        shape (ncurves, len(ctime)), e.g. for fracStdDevAll(synth[key], ...).
+    """
+    if alldata is None:
+        alldata = readAllArrays()
+    rng = np.random.default_rng(seed)
+
+    synth = {}
+    for key in sorted(alldata):
+        ctime, flux = alldata[key][0], alldata[key][1]
+        ctime = np.asarray(ctime, dtype=float)
+        fmean = np.mean(flux) if mean is None else mean
+        synth[key] = (ctime, _lightcurves(model, ctime, ncurves, rng, rms, fmean,
+                                          lognormal, **kwargs))
+    return synth
+
+
+if __name__ == "__main__":
+    import matplotlib.pyplot as plt    # import library for plots
+    from EHT_Data.Plots.fsd import fracStdDevAll
+
+    intervals = np.linspace(0.1, 3.0, 30)
+
+    # DRW with a range of damping times on the simulation cadence
+    taus = np.geomspace(0.3, 30., 2000)
+    params, ctime, flux, nsamp = synth_grid('drw', len(taus), tau=taus, seed=1)
+    fsd = np.array(list(fracStdDevAll((ctime, flux), intervals).values()))
+
+    # power-law noise at the SMA/ALMA time stamps
+    synth = synth_eht('powerlaw', 500, beta=2., seed=2)
+
+    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(9, 4.5))
+    for lo, hi in [(0.3, 1.), (1., 3.), (3., 10.), (10., 30.)]:
+        use = (taus >= lo) & (taus < hi)
+        ax1.plot(intervals, np.nanmedian(fsd[use], axis=0), label=fr'$\tau$ = {lo:g}-{hi:g} hr')
+    ax1.set_xlabel('Interval (hours)')
+    ax1.set_ylabel('FSD')
+    ax1.legend(frameon=False, fontsize='small')
+
+    key = sorted(synth)[0]
+    ctimeE, fluxE = synth[key]
+    ax2.plot(ctimeE, fluxE[:5].T, '.', ms=2)
+    ax2.set_xlabel('Time (UT)')
+    ax2.set_ylabel('Flux (Jy)')
+    ax2.set_title(' '.join(key) + r', $\beta$ = 2')
+
+    plt.tight_layout()
+    plt.show()
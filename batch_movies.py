@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+"""
+Batch driver for simMovie.py: renders a movie for every simulation archive
+in a source folder.
+
+- Several archives are rendered at once, within a core budget (every job
+  renders with --workers cores) and a scratch-disk budget.
+- Every job runs in its own work directory under the scratch folder; the
+  movie (and any extra outputs, e.g. from --extra_outputs) is moved to the
+  output folder only when it is complete.
+- A manifest in the output folder records the finished movies, so a rerun
+  skips them (unless the archive changed since).
+- Movies are encoded in checkpointed segments (--segment_frames) kept in
+  <scratch>/<name>.segments until the movie is complete, so a job that
+  failed resumes from its last finished segment on the next run. Frames
+  that cannot be read are replaced by the previous frame by default
+  (--on_frame_error) and listed in the log and the manifest.
+- Progress and failures go to a JSON-lines log, one event per line; the
+  full output of a failed job is kept in <output>/logs/<name>.log.
+
+Arguments not known here are passed on to simMovie.py, e.g.
+  python batch_movies.py --source_dir ... --output_dir ... --renderer fast
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import signal
+import argparse
+import tempfile
+import subprocess
+from collections import deque
+from datetime import datetime, timezone
+
+import simMovie
+
+
+SOURCE_DIR_DEFAULT = "/localdata/drive1/dpsaltis3/SgrAData/Data"
+WORK_ROOT_DEFAULT = os.path.join(os.path.expanduser("~"), "SgrA")
+MANIFEST_FILE = "manifest.json"
+ARCHIVE_SUFFIXES = (".tar.gz", ".tgz", ".tar.bz2", ".tar.xz", ".tar")
+
+
+# ----------------------------
+# Jobs
+# ----------------------------
+def archive_basename(path: str) -> str:
+    name = os.path.basename(path)
+    for suffix in ARCHIVE_SUFFIXES:
+        if name.endswith(suffix):
+            return name[:-len(suffix)]
+    return os.path.splitext(name)[0]
+
+
+def list_archives(source_dir: str) -> list[str]:
+    if not os.path.isdir(source_dir):
+        raise FileNotFoundError(f"Folder not found: {source_dir}")
+    return sorted(
+        os.path.join(source_dir, f)
+        for f in os.listdir(source_dir)
+        if f.endswith(ARCHIVE_SUFFIXES)
+    )
+
+
+def archive_signature(path: str) -> dict:
+    st = os.stat(path)
+    return {"size": st.st_size, "mtime": int(st.st_mtime)}
+
+
+def dir_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for f in files:
+            try:
+                total += os.path.getsize(os.path.join(root, f))
+            except OSError:
+                pass
+    return total
+
+
+class Manifest:
+    """
+    Finished movies, keyed by archive basename, with the archive size and
+    mtime they were made from. Written atomically after every job.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path) as fh:
+                self.entries = json.load(fh)
+
+    def is_done(self, name: str, archive: str, output: str) -> bool:
+        entry = self.entries.get(name)
+        return (entry is not None and os.path.exists(output)
+                and entry.get("archive_signature") == archive_signature(archive))
+
+    def add(self, name: str, entry: dict):
+        self.entries[name] = entry
+        tmp = self.path + f".{os.getpid()}.tmp"
+        with open(tmp, "w") as fh:
+            json.dump(self.entries, fh, indent=1, sort_keys=True)
+        os.replace(tmp, self.path)
+
+
+class EventLog:
+    """
+    JSON-lines log: one {"time", "event", ...} object per line, also
+    echoed to stdout in short form.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def __call__(self, event: str, **fields):
+        record = {"time": datetime.now(timezone.utc).isoformat(timespec="seconds"), "event": event}
+        record.update(fields)
+        with open(self.path, "a") as fh:
+            fh.write(json.dumps(record) + "\n")
+        short = " ".join(f"{k}={v}" for k, v in fields.items() if k not in ("log_tail", "command"))
+        print(f"[{record['time']}] {event} {short}", flush=True)
+
+
+class Job:
+    """
+    One archive -> one movie, rendered by simMovie.py in a subprocess
+    inside its own work directory.
+    """
+
+    def __init__(self, archive: str, output_dir: str, workers: int):
+        self.archive = os.path.abspath(archive)
+        self.name = archive_basename(archive)
+        self.output = os.path.join(output_dir, self.name + ".mp4")
+        self.workers = workers
+        self.segment_dir = None
+        self.work_dir = None
+        self.proc = None
+        self.log_fh = None
+        self.started = None
+
+    @property
+    def log_path(self) -> str:
+        return os.path.join(self.work_dir, "simMovie.log")
+
+    def start(self, scratch_dir: str, fps: int, segment_frames: int, on_frame_error: str,
+              extra_args: list[str]):
+        self.work_dir = tempfile.mkdtemp(prefix=self.name + ".", dir=os.path.abspath(scratch_dir))
+        # outside the work directory: kept when the job fails, for the next run
+        self.segment_dir = os.path.join(os.path.abspath(scratch_dir), self.name + ".segments")
+        self.command = [
+            sys.executable, os.path.abspath(simMovie.__file__), self.archive,
+            "--outfile", os.path.join(self.work_dir, self.name + ".mp4"),
+            "--fps", str(fps),
+            "--filename", self.name,
+            "--workers", str(self.workers),
+            "--on_frame_error", on_frame_error,
+            *extra_args
+        ]
+        if segment_frames > 0:
+            self.command += ["--segment_frames", str(segment_frames),
+                             "--segment_dir", self.segment_dir]
+        self.log_fh = open(self.log_path, "w")
+        self.started = time.time()
+        self.proc = subprocess.Popen(self.command, cwd=self.work_dir, stdout=self.log_fh,
+                                     stderr=subprocess.STDOUT, start_new_session=True)
+
+    def poll(self) -> int | None:
+        return self.proc.poll()
+
+    def scratch_used(self) -> int:
+        if not self.work_dir:
+            return 0
+        return dir_size(self.work_dir) + dir_size(self.segment_dir)
+
+    def failed_frames(self) -> list[int]:
+        """
+        Frames simMovie reported as failed (skipped or replaced).
+        """
+        return simMovie.read_failed_frames(self.log_path)
+
+    def log_tail(self, nlines: int = 20) -> str:
+        with open(self.log_path, errors="replace") as fh:
+            return "".join(deque(fh, maxlen=nlines))
+
+    def terminate(self):
+        if self.proc is not None and self.proc.poll() is None:
+            os.killpg(self.proc.pid, signal.SIGTERM)
+            self.proc.wait()
+
+    def cleanup(self):
+        if self.log_fh is not None:
+            self.log_fh.close()
+        if self.work_dir and os.path.isdir(self.work_dir):
+            shutil.rmtree(self.work_dir, ignore_errors=True)
+
+
+# ----------------------------
+# Scheduler
+# ----------------------------
+def run_batch(archives: list[str], output_dir: str, scratch_dir: str, cores: int,
+              workers_per_job: int, scratch_budget: int, job_scratch: int, fps: int,
+              extra_args: list[str], log: EventLog, segment_frames: int = 0,
+              on_frame_error: str = "fail", poll_s: float = 2.0) -> tuple[int, int, int]:
+    """
+    Renders the archives not yet in the manifest, as many at a time as the
+    core budget (workers_per_job cores per job) and the scratch budget
+    allow. A running job counts against the scratch budget with the larger
+    of its current work directory size and `job_scratch`; a job is only
+    started if that estimate also fits in the free space of the scratch disk.
+
+    With segment_frames > 0 the segments of a failed job are kept in the
+    scratch folder and the next run of that archive resumes from them.
+
+    Returns (succeeded, failed, skipped).
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    os.makedirs(scratch_dir, exist_ok=True)
+    logs_dir = os.path.join(output_dir, "logs")
+    manifest = Manifest(os.path.join(output_dir, MANIFEST_FILE))
+    workers_per_job = max(1, min(workers_per_job, cores))
+
+    pending = deque()
+    skipped = 0
+    for archive in archives:
+        job = Job(archive, output_dir, workers_per_job)
+        if manifest.is_done(job.name, archive, job.output):
+            log("skip", job=job.name, output=job.output)
+            skipped += 1
+        else:
+            pending.append(job)
+    log("batch_start", jobs=len(pending), skipped=skipped, cores=cores,
+        workers_per_job=workers_per_job, scratch_budget_mb=scratch_budget // 2**20)
+
+    running = []
+    succeeded = failed = 0
+
+    def scratch_reserved() -> int:
+        return sum(max(job.scratch_used(), job_scratch) for job in running)
+
+    try:
+        while pending or running:
+            while pending:
+                cores_used = sum(job.workers for job in running)
+                free_disk = shutil.disk_usage(scratch_dir).free
+                if running and (cores_used + workers_per_job > cores
+                                or scratch_reserved() + job_scratch > scratch_budget
+                                or free_disk < job_scratch):
+                    break
+                job = pending.popleft()
+                job.start(scratch_dir, fps, segment_frames, on_frame_error, extra_args)
+                running.append(job)
+                log("start", job=job.name, archive=job.archive, work_dir=job.work_dir,
+                    command=job.command)
+
+            time.sleep(poll_s)
+
+            for job in [j for j in running if j.poll() is not None]:
+                running.remove(job)
+                ret = job.poll()
+                seconds = round(time.time() - job.started, 1)
+                movie = job.command[job.command.index("--outfile") + 1]
+                if ret == 0 and os.path.exists(movie):
+                    # side outputs of simMovie (extra resolutions, brightness scale, light curve,
+                    # variability maps)
+                    extras = []
+                    for f in sorted(os.listdir(job.work_dir)):
+                        path = os.path.join(job.work_dir, f)
+                        if f.startswith(job.name) and f.endswith((".mp4", ".json", "_var.out", "_varmap.h5")) and path != movie:
+                            extras.append(os.path.join(output_dir, f))
+                            shutil.move(path, extras[-1])
+                    shutil.move(movie, job.output)
+                    failed_frames = job.failed_frames()
+                    manifest.add(job.name, {
+                        "archive": job.archive,
+                        "archive_signature": archive_signature(job.archive),
+                        "output": job.output,
+                        "extra_outputs": extras,
+                        "failed_frames": failed_frames,
+                        "seconds": seconds,
+                        "finished": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                    })
+                    succeeded += 1
+                    log("done", job=job.name, output=job.output, seconds=seconds,
+                        failed_frames=failed_frames, remaining=len(pending) + len(running))
+                else:
+                    os.makedirs(logs_dir, exist_ok=True)
+                    kept = os.path.join(logs_dir, job.name + ".log")
+                    job.log_fh.close()
+                    shutil.copyfile(job.log_path, kept)
+                    failed += 1
+                    log("failed", job=job.name, returncode=ret, seconds=seconds, log=kept,
+                        log_tail=job.log_tail())
+                job.cleanup()
+    except KeyboardInterrupt:
+        log("interrupted", running=[job.name for job in running], pending=len(pending))
+        for job in running:
+            job.terminate()
+            job.cleanup()
+        raise
+
+    log("batch_end", succeeded=succeeded, failed=failed, skipped=skipped)
+    return succeeded, failed, skipped
+
+
+# ----------------------------
+# Main
+# ----------------------------
+def main():
+    ap = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--source_dir", type=str, default=SOURCE_DIR_DEFAULT,
+                    help="Folder with the simulation archives (.tar.gz, ...)")
+    ap.add_argument("--output_dir", type=str,
+                    default=os.path.join(WORK_ROOT_DEFAULT, "simulation_movies"))
+    ap.add_argument("--scratch_dir", type=str, default=os.path.join(WORK_ROOT_DEFAULT, "scratch"),
+                    help="Parent of the per-job work directories")
+    ap.add_argument("--log", type=str, default=None,
+                    help="JSON-lines event log (default <output_dir>/batch_log.jsonl)")
+    ap.add_argument("--cores", type=int, default=os.cpu_count() or 1,
+                    help="Cores to use for all jobs together")
+    ap.add_argument("--workers", type=int, default=2,
+                    help="Render processes (cores) per job")
+    ap.add_argument("--scratch_gb", type=float, default=20.0,
+                    help="Scratch space for all work directories together")
+    ap.add_argument("--job_scratch_mb", type=float, default=500.0,
+                    help="Scratch space reserved for every running job")
+    ap.add_argument("--fps", type=int, default=10)
+    ap.add_argument("--segment_frames", type=int, default=500,
+                    help="Checkpoint every movie in segments of this many frames, so a failed "
+                         "job resumes on the next run (0 = no segments)")
+    ap.add_argument("--on_frame_error", type=str, default="previous",
+                    choices=["fail", "skip", "previous"],
+                    help="What simMovie does with a frame that cannot be read")
+    ap.add_argument("--limit", type=int, default=None,
+                    help="Only process the first N archives (e.g. 1 for a test run)")
+    args, extra_args = ap.parse_known_args()
+
+    archives = list_archives(args.source_dir)
+    if args.limit is not None:
+        archives = archives[:args.limit]
+    if not archives:
+        print(f"No archives found in {args.source_dir}")
+        return 0
+
+    log = EventLog(args.log or os.path.join(args.output_dir, "batch_log.jsonl"))
+    os.makedirs(os.path.dirname(os.path.abspath(log.path)), exist_ok=True)
+
+    succeeded, failed, skipped = run_batch(
+        archives,
+        output_dir=args.output_dir,
+        scratch_dir=args.scratch_dir,
+        cores=args.cores,
+        workers_per_job=args.workers,
+        scratch_budget=int(args.scratch_gb * 2**30),
+        job_scratch=int(args.job_scratch_mb * 2**20),
+        fps=args.fps,
+        extra_args=extra_args,
+        log=log,
+        segment_frames=args.segment_frames,
+        on_frame_error=args.on_frame_error
+    )
+    print(f"Movies saved in: {args.output_dir} ({succeeded} new, {skipped} skipped, {failed} failed)")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -42,49 +42,15 @@ echo "" | tee -a "$LOG_FILE"
 
 BASENAME=$(basename "$tarfile" .tar.gz)
 
-# Copy file
-if ! cp "${SOURCE_DIR}/${tarfile}" "${WORK_DIR}/" 2>> "$LOG_FILE"; then
-    echo "ERROR: Failed to copy file" | tee -a "$LOG_FILE"
-    exit 1
-fi
-
-cd "$WORK_DIR" || { echo "Error: Cannot access $WORK_DIR" | tee -a "$LOG_FILE"; exit 1; }
-
-# Extract
-if ! tar -xzf "$tarfile" -C "${WORK_DIR}" 2>> "$LOG_FILE"; then
-    echo "ERROR: Extraction failed" | tee -a "$LOG_FILE"
-    rm -f "$tarfile"
-    exit 1
-fi
-
-# Find extracted directory
-EXTRACTED_DIR=$(find "${WORK_DIR}" -maxdepth 1 -type d ! -path "${WORK_DIR}" ! -path "${WORK_DIR}/simulation_movies" | head -1)
-
-if [ -z "$EXTRACTED_DIR" ]; then
-    if ls "${WORK_DIR}"/*.h5 1> /dev/null 2>&1; then
-        EXTRACTED_DIR="${WORK_DIR}"
-    else
-        echo "ERROR: No extracted directory or .h5 files found" | tee -a "$LOG_FILE"
-        rm -f "$tarfile"
-        exit 1
-    fi
-fi
-
-# Run Python script
+# Run Python script on the archive (the .h5 members are streamed, not extracted)
 OUTPUT_MOVIE="${OUTPUT_DIR}/${BASENAME}.mp4"
 
-if python3 "$PYTHON_SCRIPT" "$EXTRACTED_DIR" --outfile "$OUTPUT_MOVIE" --fps 10 --filename "$BASENAME" >> "$LOG_FILE" 2>&1; then
+if python3 "$PYTHON_SCRIPT" "${SOURCE_DIR}/${tarfile}" --outfile "$OUTPUT_MOVIE" --fps 10 --filename "$BASENAME" >> "$LOG_FILE" 2>&1; then
     echo "✓ Movie created successfully: ${BASENAME}.mp4" | tee -a "$LOG_FILE"
 else
     echo "ERROR: Python script failed" | tee -a "$LOG_FILE"
 fi
 
-# Cleanup
-rm -f "$tarfile"
-if [ "$EXTRACTED_DIR" != "$WORK_DIR" ] && [ -d "$EXTRACTED_DIR" ]; then
-    rm -rf "$EXTRACTED_DIR" 2>> "$LOG_FILE"
-fi
-
 echo "" | tee -a "$LOG_FILE"
 echo "======================================" >> "$LOG_FILE"
 echo "TEST completed at $(date)" >> "$LOG_FILE"
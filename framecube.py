@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Packs the .h5 frames of a simulation (a folder, or a tar archive read
+without extracting it) into one HDF5 frame cube, so movies and image
+analyses read one file instead of decompressing the archive and opening
+thousands of files every time.
+
+The cube holds
+- frames: the images, time x ny x nx, one chunk per frame, gzip (default),
+  lzf or no compression (uncompressed frames are read through a memory map
+  of the file), stored as float32 or float16 (--float16: half the size,
+  about 3 significant digits; values are divided by the peak of the first
+  frame, kept in the value_scale attribute, to stay in the float16 range)
+- header: the header group of the first frame (camera dx/nx, scale, ...)
+- names: the original file names, in frame order
+- attributes: the parameters parsed from the simulation name
+  (extract_parameters, as param_<name>), the image dataset path of the
+  original frames and the source.
+
+simMovie.py reads a cube in place of a folder:
+  python framecube.py MAD_a+0.94_230GHz_i_30_Rhigh_160.tar.gz
+  python simMovie.py MAD_a+0.94_230GHz_i_30_Rhigh_160.h5 --outfile movie.mp4
+"""
+import os
+import sys
+import argparse
+
+import numpy as np
+import h5py
+
+import simMovie
+
+
+COMPRESSIONS = ("gzip", "lzf", "none")
+
+
+# ----------------------------
+# Packing
+# ----------------------------
+def pack_frames(h5_files: list[str] | simMovie.H5Archive, outfile: str, params: dict,
+                float16: bool = False, compression: str = "gzip", level: int = 4,
+                dataset_path_override: str | None = None,
+                layout_cache: simMovie.LayoutCache | None = None, prefetch: int = 8) -> int:
+    """
+    Writes the frames of `h5_files` into a frame cube at `outfile` (through
+    a temporary file, so an interrupted run leaves no partial cube).
+    Frames keep their stored values (no peak normalization). Returns the
+    number of frames.
+    """
+    first_file = simMovie.first_frame(h5_files)
+    first = simMovie.prepare_first_frame(first_file, dataset_path_override, layout_cache)
+    reader = simMovie.FrameReader(first_file, first["use_physical"], first["dataset_path"],
+                                  normalize=False)
+    ny, nx = reader.image_shape
+    dataset_path = reader.path
+    archive = isinstance(h5_files, simMovie.H5Archive)
+    nframes = 0 if archive else len(h5_files)
+
+    storage = dict(chunks=(1, ny, nx))
+    if compression == "gzip":
+        storage.update(compression="gzip", compression_opts=level, shuffle=True)
+    elif compression == "lzf":
+        storage.update(compression="lzf", shuffle=True)
+
+    value_scale = 1.0
+    if float16:
+        peak = np.nanmax(np.abs(reader.read(first_file, out=reader.new_buffer())))
+        value_scale = float(peak) if peak > 0 else 1.0
+
+    tmp = outfile + f".{os.getpid()}.tmp"
+    names = h5_files.names if archive else h5_files
+    try:
+        with h5py.File(tmp, "w") as f:
+            ds = f.create_dataset(simMovie.FrameCube.DATASET, shape=(nframes, ny, nx),
+                                  maxshape=(None, ny, nx),
+                                  dtype=np.float16 if float16 else np.float32, **storage)
+            ds.attrs["value_scale"] = value_scale
+            with h5py.File(first_file, "r") as src:
+                if "header" in src:
+                    src.copy(src["header"], f, "header")
+
+            source = simMovie.FrameSource(h5_files, reader, readahead=prefetch)
+            n = 0
+            for i, image in source:
+                if i >= ds.shape[0]:
+                    ds.resize(i + 1, axis=0)
+                ds[i] = image / value_scale if float16 else image
+                n = i + 1
+            source.report()
+
+            f.create_dataset("names", data=[os.path.basename(str(names[i])) for i in range(n)],
+                             dtype=h5py.string_dtype())
+            f.attrs["dataset_path"] = dataset_path
+            f.attrs["source"] = os.path.abspath(h5_files.path if archive else os.path.dirname(h5_files[0]))
+            for key, value in params.items():
+                f.attrs[f"param_{key}"] = value
+        os.replace(tmp, outfile)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return n
+
+
+# ----------------------------
+# Main
+# ----------------------------
+def main():
+    ap = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("source", type=str,
+                    help="Folder of .h5 frames, or a tar archive (.tar, .tar.gz, ...) of them")
+    ap.add_argument("--outfile", type=str, default=None,
+                    help="Frame cube to write (default <source name>.h5 in the current folder)")
+    ap.add_argument("--filename", type=str, default=None,
+                    help="Simulation name to parse parameters from (default the source name)")
+    ap.add_argument("--float16", action="store_true",
+                    help="Store the frames as float16 (half the size, ~3 significant digits)")
+    ap.add_argument("--compression", type=str, default="gzip", choices=COMPRESSIONS,
+                    help="Compression of the frame chunks (none: memory-mapped reads)")
+    ap.add_argument("--level", type=int, default=4, help="gzip level")
+    ap.add_argument("--dataset_path", type=str, default=None,
+                    help="Image dataset of frames without the physical header keys")
+    ap.add_argument("--layout_cache", type=str, default=simMovie.LAYOUT_CACHE_DEFAULT,
+                    help="JSON cache of auto-detected image datasets ('none' to always detect)")
+    ap.add_argument("--prefetch", type=int, default=8,
+                    help="Frames read ahead in background threads")
+    args = ap.parse_args()
+
+    name = os.path.basename(os.path.normpath(args.source))
+    for suffix in (".tar.gz", ".tgz", ".tar.bz2", ".tar.xz", ".tar"):
+        if name.endswith(suffix):
+            name = name[:-len(suffix)]
+            break
+    outfile = args.outfile or name + ".h5"
+
+    h5_files = simMovie.open_frames(args.source)
+    if isinstance(h5_files, simMovie.FrameCube):
+        print(f"{args.source} is a frame cube already")
+        return 1
+    layout_cache = (None if args.layout_cache.lower() == "none"
+                    else simMovie.LayoutCache(args.layout_cache))
+    params = simMovie.extract_parameters(args.filename or name)
+
+    n = pack_frames(h5_files, outfile, params, float16=args.float16,
+                    compression=args.compression, level=args.level,
+                    dataset_path_override=args.dataset_path, layout_cache=layout_cache,
+                    prefetch=args.prefetch)
+    print(f"Frame cube of {n} frames saved: {outfile} ({os.path.getsize(outfile) / 2**20:.1f} MB)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())